@@ -5,246 +5,401 @@ Processes unscored memories for R(t) evaluation without blocking user responses
 
 import asyncio
 import hashlib
+import json
+import re
 import time
 import os
 import psycopg2
+from psycopg2.extras import execute_values
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List, Dict, Optional
-from model_service import ModelService
+from model_service import get_model_service
+
+# In-process LRU in front of memory_quality_cache; hits skip the database round-trip
+RIAI_SCORE_CACHE_SIZE = int(os.getenv("RIAI_SCORE_CACHE_SIZE", "4096"))
+
+# Evaluator model; part of every cache key, so switching models re-scores responses
+RIAI_EVALUATION_MODEL = os.getenv("RIAI_EVALUATION_MODEL", "mistralai/mistral-small-3.2-24b-instruct")
+
+# Output token budget for a single score, and per score in a batched reply
+RIAI_SCORE_MAX_TOKENS = 16
+RIAI_BATCH_TOKENS_PER_SCORE = 8
+
+# JSON array in a batched evaluator reply, tolerating prose or code fences around it
+SCORE_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+# Score formats tried in order when a single reply isn't a bare number
+SCORE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\*\*Score:\s*(\d+(?:\.\d+)?)\*\*',  # **Score: 9**
+    r'Score:\s*(\d+(?:\.\d+)?)',          # Score: 9
+    r'(\d+(?:\.\d+)?)/10',                # 9/10
+    r'(\d+(?:\.\d+)?)$',                  # Just number at end
+    r'(\d+(?:\.\d+)?)',                   # Any number
+)]
 
 class BackgroundRIAIService:
-    """Service for background R(t) evaluation with batching and caching"""
+    """Service for background R(t) evaluation with batching and caching
+    
+    Database access uses blocking psycopg2, so each query helper runs in a worker
+    thread via asyncio.to_thread to keep the shared event loop serving requests.
+    process_batch opens one connection and passes it to every helper it calls.
+    """
     
     def __init__(self):
-        self.model_service = ModelService()
+        self.model_service = get_model_service()
         self.is_running = False
         self.batch_size = 20
+        self.eval_concurrency = max(1, int(os.getenv("RIAI_EVAL_CONCURRENCY", "4")))
         self.process_interval = 1800  # 30 minutes
         self.db_url = os.getenv("DATABASE_URL")
+        self._score_cache: "OrderedDict[str, float]" = OrderedDict()
         
     def get_db_connection(self):
         """Get PostgreSQL database connection"""
         return psycopg2.connect(self.db_url)
+    
+    @contextmanager
+    def borrow_connection(self, conn=None):
+        """Yield conn when given, otherwise a new connection that is closed on exit
+        
+        A failed statement is rolled back so a shared connection stays usable.
+        """
+        owned = conn is None
+        if owned:
+            conn = self.get_db_connection()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if owned:
+                conn.close()
         
     def generate_response_hash(self, content: str) -> str:
-        """Generate hash for response content to enable caching"""
-        return hashlib.md5(content.encode()).hexdigest()
+        """Generate hash for response content and evaluator model to enable caching"""
+        return hashlib.blake2b(f"{RIAI_EVALUATION_MODEL}\0{content}".encode(), digest_size=16).hexdigest()
+    
+    def _remember_score(self, response_hash: str, r_t_score: float):
+        """Add a score to the in-process LRU, evicting the oldest entry when full"""
+        if RIAI_SCORE_CACHE_SIZE <= 0:
+            return
+        self._score_cache[response_hash] = r_t_score
+        self._score_cache.move_to_end(response_hash)
+        while len(self._score_cache) > RIAI_SCORE_CACHE_SIZE:
+            self._score_cache.popitem(last=False)
     
     async def get_cached_score(self, response_hash: str) -> Optional[float]:
         """Check if we have a cached R(t) score for this response"""
-        conn = None
+        return (await self.get_cached_scores([response_hash])).get(response_hash)
+    
+    async def get_cached_scores(self, response_hashes: List[str], conn=None) -> Dict[str, float]:
+        """Look up cached R(t) scores for many responses, in memory then in one query"""
+        cached = {}
+        for response_hash in response_hashes:
+            r_t_score = self._score_cache.get(response_hash)
+            if r_t_score is not None:
+                self._score_cache.move_to_end(response_hash)
+                cached[response_hash] = r_t_score
+        
+        missing = [response_hash for response_hash in response_hashes if response_hash not in cached]
+        if missing:
+            stored = await asyncio.to_thread(self._get_cached_scores_sync, missing, conn)
+            for response_hash, r_t_score in stored.items():
+                self._remember_score(response_hash, r_t_score)
+            cached.update(stored)
+        return cached
+    
+    def _get_cached_scores_sync(self, response_hashes: List[str], conn=None) -> Dict[str, float]:
+        """Blocking psycopg2 implementation of get_cached_scores"""
+        if not response_hashes:
+            return {}
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT r_t_score FROM memory_quality_cache 
-                WHERE response_hash = %s
-            """, (response_hash,))
-            
-            result = cursor.fetchone()
-            cursor.close()
-            
-            return result[0] if result else None
+            with self.borrow_connection(conn) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT response_hash, r_t_score FROM memory_quality_cache 
+                    WHERE response_hash = ANY(%s)
+                """, (list(set(response_hashes)),))
+                
+                cached = {row[0]: row[1] for row in cursor.fetchall()}
+                cursor.close()
+                # End the read so a shared connection isn't idle in transaction
+                conn.commit()
+                
+                return cached
                 
         except Exception as e:
             print(f"Error checking cache: {e}")
-            return None
-        finally:
-            if conn:
-                conn.close()
+            return {}
     
     async def store_cached_score(self, response_hash: str, r_t_score: float):
         """Store R(t) score in cache for future use"""
-        conn = None
+        return await self.store_cached_scores({response_hash: r_t_score})
+    
+    async def store_cached_scores(self, scores: Dict[str, float], conn=None):
+        """Store many R(t) scores in the cache with one statement"""
+        if not scores:
+            return
+        for response_hash, r_t_score in scores.items():
+            self._remember_score(response_hash, r_t_score)
+        return await asyncio.to_thread(self._store_cached_scores_sync, scores, conn)
+    
+    def _store_cached_scores_sync(self, scores: Dict[str, float], conn=None):
+        """Blocking psycopg2 implementation of store_cached_scores"""
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO memory_quality_cache (response_hash, r_t_score)
-                VALUES (%s, %s)
-                ON CONFLICT (response_hash) 
-                DO UPDATE SET r_t_score = EXCLUDED.r_t_score
-            """, (response_hash, r_t_score))
-            
-            conn.commit()
-            cursor.close()
+            with self.borrow_connection(conn) as conn:
+                cursor = conn.cursor()
+                
+                execute_values(cursor, """
+                    INSERT INTO memory_quality_cache (response_hash, r_t_score)
+                    VALUES %s
+                    ON CONFLICT (response_hash) 
+                    DO UPDATE SET r_t_score = EXCLUDED.r_t_score
+                """, list(scores.items()))
+                
+                conn.commit()
+                cursor.close()
                 
         except Exception as e:
             print(f"Error storing cache: {e}")
-        finally:
-            if conn:
-                conn.close()
     
-    async def get_unscored_memories(self, limit: int = 20) -> List[Dict]:
+    async def get_unscored_memories(self, limit: int = 20, conn=None) -> List[Dict]:
         """Get memories that need R(t) evaluation"""
-        conn = None
+        return await asyncio.to_thread(self._get_unscored_memories_sync, limit, conn)
+    
+    def _get_unscored_memories_sync(self, limit: int = 20, conn=None) -> List[Dict]:
+        """Blocking psycopg2 implementation of get_unscored_memories"""
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, content, user_id, created_at
-                FROM intelligent_memories
-                WHERE message_type = 'assistant'
-                AND r_t_score IS NULL
-                AND content IS NOT NULL
-                ORDER BY created_at ASC
-                LIMIT %s
-            """, (limit,))
-            
-            memories = []
-            for record in cursor.fetchall():
-                memories.append({
-                    'memory_id': record[0],
-                    'content': record[1],
-                    'user_id': record[2],
-                    'timestamp': record[3]
-                })
-            
-            cursor.close()
-            return memories
+            with self.borrow_connection(conn) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT id, content, user_id, created_at
+                    FROM intelligent_memories
+                    WHERE message_type = 'assistant'
+                    AND r_t_score IS NULL
+                    AND content IS NOT NULL
+                    ORDER BY created_at ASC
+                    LIMIT %s
+                """, (limit,))
+                
+                memories = []
+                for record in cursor.fetchall():
+                    memories.append({
+                        'memory_id': record[0],
+                        'content': record[1],
+                        'user_id': record[2],
+                        'timestamp': record[3]
+                    })
+                
+                cursor.close()
+                # End the read so a shared connection isn't idle in transaction
+                conn.commit()
+                return memories
                 
         except Exception as e:
             print(f"Error getting unscored memories: {e}")
             return []
-        finally:
-            if conn:
-                conn.close()
     
-    async def evaluate_batch(self, memories: List[Dict]) -> List[Dict]:
+    async def evaluate_batch(self, memories: List[Dict], conn=None) -> List[Dict]:
         """Evaluate a batch of memories for R(t) scores"""
         evaluation_results = []
         
-        for memory in memories:
-            try:
-                content = memory['content']
-                response_hash = self.generate_response_hash(content)
-                
-                # Check cache first
-                cached_score = await self.get_cached_score(response_hash)
-                if cached_score is not None:
-                    print(f"Using cached R(t) score: {cached_score}")
-                    evaluation_results.append({
-                        'memory_id': memory['memory_id'],
-                        'user_id': memory['user_id'],
-                        'r_t_score': cached_score,
-                        'cached': True
-                    })
-                    continue
-                
-                # Evaluate using Mistral model
-                messages = [
-                    {"role": "system", "content": "You are an AI response quality evaluator. Rate the quality of AI responses on a scale of 1-10, where 1 is poor and 10 is excellent. Consider accuracy, helpfulness, clarity, and completeness. Respond with just the numerical score."},
-                    {"role": "user", "content": f"Rate this AI response: {content}"}
-                ]
-                
-                # Use Mistral-Small for evaluation
-                response_text = await self.model_service.chat_completion(
-                    messages=messages,
-                    model="mistralai/mistral-small-3.2-24b-instruct"
-                )
-                
-                # Extract numerical score with improved parsing
-                score_text = response_text.strip()
-                try:
-                    # Try direct float conversion first
-                    r_t_score = float(score_text)
-                except ValueError:
-                    # Try parsing from various formats
-                    import re
-                    # Look for patterns like "Score: 9", "**Score: 9**", "9/10", etc.
-                    score_patterns = [
-                        r'\*\*Score:\s*(\d+(?:\.\d+)?)\*\*',  # **Score: 9**
-                        r'Score:\s*(\d+(?:\.\d+)?)',          # Score: 9
-                        r'(\d+(?:\.\d+)?)/10',                # 9/10
-                        r'(\d+(?:\.\d+)?)$',                  # Just number at end
-                        r'(\d+(?:\.\d+)?)',                   # Any number
-                    ]
-                    
-                    r_t_score = None
-                    for pattern in score_patterns:
-                        match = re.search(pattern, score_text)
-                        if match:
-                            try:
-                                r_t_score = float(match.group(1))
-                                break
-                            except ValueError:
-                                continue
-                    
-                    if r_t_score is None:
-                        print(f"Could not parse R(t) score: {score_text}")
-                        continue
-                
-                # Clamp to valid range
-                r_t_score = max(1.0, min(10.0, r_t_score))
-                
-                # Store in cache
-                await self.store_cached_score(response_hash, r_t_score)
-                
+        # Check the cache for the whole batch in one round-trip
+        response_hashes = [self.generate_response_hash(memory['content']) for memory in memories]
+        cached_scores = await self.get_cached_scores(response_hashes, conn)
+        
+        uncached = []
+        for memory, response_hash in zip(memories, response_hashes):
+            cached_score = cached_scores.get(response_hash)
+            if cached_score is not None:
+                print(f"Using cached R(t) score: {cached_score}")
                 evaluation_results.append({
+                    'memory_id': memory['memory_id'],
+                    'user_id': memory['user_id'],
+                    'r_t_score': cached_score,
+                    'cached': True
+                })
+            else:
+                uncached.append((memory, response_hash))
+        
+        if not uncached:
+            return evaluation_results
+        
+        # Rate every uncached memory with one evaluator request when the reply parses
+        fresh_results = await self.evaluate_memories_together([memory for memory, _ in uncached])
+        if fresh_results is None:
+            # Otherwise fall back to independent calls, running a bounded number concurrently
+            semaphore = asyncio.Semaphore(self.eval_concurrency)
+            
+            async def evaluate_with_limit(memory: Dict) -> Optional[Dict]:
+                async with semaphore:
+                    return await self.evaluate_memory(memory)
+            
+            results = await asyncio.gather(*(evaluate_with_limit(memory) for memory, _ in uncached))
+            fresh_results = [result for result in results if result is not None]
+        
+        # Cache every new score with one write
+        hash_by_memory = {memory['memory_id']: response_hash for memory, response_hash in uncached}
+        await self.store_cached_scores({hash_by_memory[result['memory_id']]: result['r_t_score']
+                                        for result in fresh_results}, conn)
+        
+        evaluation_results.extend(fresh_results)
+        return evaluation_results
+    
+    async def evaluate_memories_together(self, memories: List[Dict]) -> Optional[List[Dict]]:
+        """Evaluate uncached memories in a single prompt
+        
+        Returns None if the request fails or the reply doesn't hold a JSON array with one
+        score per memory, so the caller can fall back to per-memory evaluation.
+        """
+        try:
+            numbered = "\n\n".join(
+                f"{number}. {memory['content']}" for number, memory in enumerate(memories, 1)
+            )
+            messages = [
+                {"role": "system", "content": "You are an AI response quality evaluator. Rate the quality of AI responses on a scale of 1-10, where 1 is poor and 10 is excellent. Consider accuracy, helpfulness, clarity, and completeness."},
+                {"role": "user", "content": f"Rate each of these {len(memories)} AI responses. Respond with just a JSON object of the form {{\"scores\": [...]}} holding {len(memories)} numerical scores, in order.\n\n{numbered}"}
+            ]
+            
+            # Use Mistral-Small for evaluation, constrained to a short JSON reply
+            response_text = await self.model_service.chat_completion(
+                messages=messages,
+                model=RIAI_EVALUATION_MODEL,
+                max_tokens=RIAI_SCORE_MAX_TOKENS + RIAI_BATCH_TOKENS_PER_SCORE * len(memories),
+                response_format={"type": "json_object"}
+            )
+            
+            array_match = SCORE_ARRAY_RE.search(response_text)
+            scores = json.loads(array_match.group()) if array_match else None
+            if not isinstance(scores, list) or len(scores) != len(memories):
+                print(f"Could not parse batched R(t) scores: {response_text}")
+                return None
+            
+            results = []
+            for memory, score in zip(memories, scores):
+                # Clamp to valid range
+                r_t_score = max(1.0, min(10.0, float(score)))
+                results.append({
                     'memory_id': memory['memory_id'],
                     'user_id': memory['user_id'],
                     'r_t_score': r_t_score,
                     'cached': False
                 })
+            
+            print(f"R(t) evaluation: {len(results)} memories scored in one request")
+            return results
                 
-                print(f"R(t) evaluation: {r_t_score}/10 for memory {memory['memory_id'][:8]}...")
-                    
-            except Exception as e:
-                print(f"Error evaluating memory {memory['memory_id']}: {e}")
-                continue
-        
-        return evaluation_results
+        except Exception as e:
+            print(f"Error evaluating memory batch: {e}")
+            return None
     
-    async def update_memory_scores(self, evaluation_results: List[Dict]):
-        """Update memories with R(t) scores and calculate final quality scores"""
-        for result in evaluation_results:
-            conn = None
+    async def evaluate_memory(self, memory: Dict) -> Optional[Dict]:
+        """Evaluate a single uncached memory for its R(t) score"""
+        try:
+            content = memory['content']
+            
+            # Evaluate using Mistral model
+            messages = [
+                {"role": "system", "content": "You are an AI response quality evaluator. Rate the quality of AI responses on a scale of 1-10, where 1 is poor and 10 is excellent. Consider accuracy, helpfulness, clarity, and completeness. Respond with just the numerical score."},
+                {"role": "user", "content": f"Rate this AI response: {content}"}
+            ]
+            
+            # Use Mistral-Small for evaluation
+            response_text = await self.model_service.chat_completion(
+                messages=messages,
+                model=RIAI_EVALUATION_MODEL,
+                max_tokens=RIAI_SCORE_MAX_TOKENS
+            )
+            
+            # Extract numerical score with improved parsing
+            score_text = response_text.strip()
             try:
-                memory_id = result['memory_id']
-                user_id = result['user_id']
-                r_t_score = result['r_t_score']
+                # Try direct float conversion first
+                r_t_score = float(score_text)
+            except ValueError:
+                # Look for patterns like "Score: 9", "**Score: 9**", "9/10", etc.
+                r_t_score = None
+                for pattern in SCORE_PATTERNS:
+                    match = pattern.search(score_text)
+                    if match:
+                        try:
+                            r_t_score = float(match.group(1))
+                            break
+                        except ValueError:
+                            continue
                 
-                # Update R(t) score in PostgreSQL
-                conn = self.get_db_connection()
-                cursor = conn.cursor()
+                if r_t_score is None:
+                    print(f"Could not parse R(t) score: {score_text}")
+                    return None
+            
+            # Clamp to valid range
+            r_t_score = max(1.0, min(10.0, r_t_score))
+            
+            print(f"R(t) evaluation: {r_t_score}/10 for memory {memory['memory_id'][:8]}...")
+            
+            return {
+                'memory_id': memory['memory_id'],
+                'user_id': memory['user_id'],
+                'r_t_score': r_t_score,
+                'cached': False
+            }
                 
-                # Update R(t) score
-                cursor.execute("""
-                    UPDATE intelligent_memories 
-                    SET r_t_score = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (r_t_score, memory_id))
+        except Exception as e:
+            print(f"Error evaluating memory {memory['memory_id']}: {e}")
+            return None
+    
+    async def update_memory_scores(self, evaluation_results: List[Dict], conn=None):
+        """Update memories with R(t) scores and calculate final quality scores"""
+        return await asyncio.to_thread(self._update_memory_scores_sync, evaluation_results, conn)
+    
+    def _update_memory_scores_sync(self, evaluation_results: List[Dict], conn=None):
+        """Blocking psycopg2 implementation of update_memory_scores"""
+        if not evaluation_results:
+            return
+        try:
+            # One transaction and two statements for the whole batch: write every
+            # R(t) score reading back H(t), then write the final scores computed
+            # for all rows at once
+            with self.borrow_connection(conn) as conn:
+                cursor = conn.cursor()
                 
-                # Get current H(t) score to calculate final quality score
                 cursor.execute("""
-                    SELECT h_t_score FROM intelligent_memories WHERE id = %s
-                """, (memory_id,))
+                    UPDATE intelligent_memories m
+                    SET r_t_score = t.score, updated_at = CURRENT_TIMESTAMP
+                    FROM unnest(%s::uuid[], %s::float8[]) AS t(id, score)
+                    WHERE m.id = t.id
+                    RETURNING m.id, m.r_t_score, m.h_t_score
+                """, ([str(result['memory_id']) for result in evaluation_results],
+                      [result['r_t_score'] for result in evaluation_results]))
                 
-                h_t_result = cursor.fetchone()
-                h_t_score = h_t_result[0] if h_t_result and h_t_result[0] is not None else None
-                
-                # Calculate final quality score using f(R(t), H(t))
-                final_quality_score = self.calculate_final_quality_score(r_t_score, h_t_score)
-                
-                # Update final quality score
-                cursor.execute("""
-                    UPDATE intelligent_memories 
-                    SET final_quality_score = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (final_quality_score, memory_id))
+                updated = cursor.fetchall()
+                if updated:
+                    memory_ids = [str(row[0]) for row in updated]
+                    r_t_scores = np.array([row[1] for row in updated], dtype=np.float64)
+                    h_t_scores = np.array([np.nan if row[2] is None else row[2] for row in updated], dtype=np.float64)
+                    
+                    # Calculate final quality scores using f(R(t), H(t))
+                    final_scores = self.calculate_final_quality_scores(r_t_scores, h_t_scores)
+                    
+                    cursor.execute("""
+                        UPDATE intelligent_memories m
+                        SET final_quality_score = t.score, updated_at = CURRENT_TIMESTAMP
+                        FROM unnest(%s::uuid[], %s::float8[]) AS t(id, score)
+                        WHERE m.id = t.id
+                    """, (memory_ids, final_scores.tolist()))
+                    
+                    for memory_id, r_t_score, final_quality_score in zip(memory_ids, r_t_scores, final_scores):
+                        print(f"Updated memory {memory_id[:8]}... with R(t)={r_t_score}, final={final_quality_score}")
                 
                 conn.commit()
                 cursor.close()
-                
-                print(f"Updated memory {str(memory_id)[:8]}... with R(t)={r_t_score}, final={final_quality_score}")
-                
-            except Exception as e:
-                print(f"Error updating memory scores: {e}")
-            finally:
-                if conn:
-                    conn.close()
+            
+        except Exception as e:
+            print(f"Error updating memory scores: {e}")
     
     def calculate_final_quality_score(self, r_t_score: Optional[float], h_t_score: Optional[float]) -> Optional[float]:
         """Calculate final quality score using f(R(t), H(t)) intelligence refinement function"""
@@ -265,11 +420,22 @@ class BackgroundRIAIService:
         # Ensure score is in valid range
         return max(1.0, min(10.0, final_score))
     
+    @staticmethod
+    def calculate_final_quality_scores(r_t_scores: np.ndarray, h_t_scores: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_final_quality_score; missing H(t) scores are NaN"""
+        weighted = (r_t_scores * 1.0 + h_t_scores * 1.5) / (1.0 + 1.5)
+        final_scores = np.where(np.isnan(h_t_scores), r_t_scores, weighted)
+        return np.clip(final_scores, 1.0, 10.0)
+    
     async def process_batch(self) -> Dict[str, int]:
         """Process a batch of unscored memories"""
+        conn = None
         try:
+            # Share one connection across every query in the batch
+            conn = await asyncio.to_thread(self.get_db_connection)
+            
             # Get unscored memories
-            memories = await self.get_unscored_memories(self.batch_size)
+            memories = await self.get_unscored_memories(self.batch_size, conn)
             
             if not memories:
                 print("No memories to evaluate")
@@ -278,14 +444,14 @@ class BackgroundRIAIService:
             print(f"Processing {len(memories)} memories for R(t) evaluation")
             
             # Evaluate batch
-            evaluation_results = await self.evaluate_batch(memories)
+            evaluation_results = await self.evaluate_batch(memories, conn)
             
             if not evaluation_results:
                 print("No successful evaluations")
                 return {'processed': 0, 'cached': 0, 'evaluated': 0}
             
             # Update memory scores
-            await self.update_memory_scores(evaluation_results)
+            await self.update_memory_scores(evaluation_results, conn)
             
             # Calculate statistics
             cached_count = sum(1 for r in evaluation_results if r['cached'])
@@ -300,6 +466,9 @@ class BackgroundRIAIService:
         except Exception as e:
             print(f"Error in batch processing: {e}")
             return {'processed': 0, 'cached': 0, 'evaluated': 0}
+        finally:
+            if conn:
+                conn.close()
     
     async def start_background_service(self):
         """Start the background R(t) evaluation service"""
@@ -312,19 +481,20 @@ class BackgroundRIAIService:
         
         while self.is_running:
             try:
-                start_time = time.time()
+                # Monotonic clock so wall-clock/NTP adjustments can't skew timing
+                start_time = time.monotonic()
                 
                 # Process batch
                 stats = await self.process_batch()
                 
-                processing_time = time.time() - start_time
+                processing_time = time.monotonic() - start_time
                 
                 print(f"Batch processed in {processing_time:.2f}s: "
                       f"{stats['processed']} total, {stats['cached']} cached, "
                       f"{stats['evaluated']} evaluated")
                 
-                # Wait for next cycle
-                await asyncio.sleep(self.process_interval)
+                # Wait for next cycle, keeping a fixed cadence regardless of batch duration
+                await asyncio.sleep(max(0.0, self.process_interval - processing_time))
                 
             except Exception as e:
                 print(f"Error in background service: {e}")
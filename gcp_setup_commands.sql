@@ -2,7 +2,15 @@
 -- Run these commands once your Cloud SQL instance is created
 
 -- 1. Enable pgvector extension
+-- Memory search relies on HNSW iterative index scans (hnsw.iterative_scan), added in
+-- pgvector 0.8.0; existing installs: ALTER EXTENSION vector UPDATE;
 CREATE EXTENSION IF NOT EXISTS vector;
+DO $$
+BEGIN
+    IF string_to_array((SELECT extversion FROM pg_extension WHERE extname = 'vector'), '.')::int[] < ARRAY[0, 8] THEN
+        RAISE EXCEPTION 'pgvector >= 0.8.0 is required for filtered HNSW memory search';
+    END IF;
+END $$;
 
 -- 2. Create the main database schema
 CREATE TABLE IF NOT EXISTS users (
@@ -76,9 +84,34 @@ CREATE INDEX IF NOT EXISTS idx_intelligent_memories_message_type ON intelligent_
 CREATE INDEX IF NOT EXISTS idx_intelligent_memories_quality_score ON intelligent_memories(quality_score);
 CREATE INDEX IF NOT EXISTS idx_intelligent_memories_created_at ON intelligent_memories(created_at);
 
+-- RIAI scores written by the background scorer
+ALTER TABLE intelligent_memories ADD COLUMN IF NOT EXISTS r_t_score FLOAT;
+ALTER TABLE intelligent_memories ADD COLUMN IF NOT EXISTS h_t_score FLOAT;
+
+-- Partial indexes for the unscored-memory queues (per user, and oldest-first across
+-- users for the background scorer); only unscored assistant rows are indexed
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_intelligent_memories_unscored_user
+ON intelligent_memories (user_id, created_at DESC)
+WHERE r_t_score IS NULL AND message_type = 'assistant';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_intelligent_memories_unscored
+ON intelligent_memories (created_at)
+WHERE r_t_score IS NULL AND message_type = 'assistant';
+
+-- Recent-context fallback in retrieve_memory
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_intelligent_memories_user_conversation_recent
+ON intelligent_memories (user_id, conversation_id, created_at DESC);
+
 -- 5. Create HNSW index for vector similarity search
-CREATE INDEX IF NOT EXISTS idx_intelligent_memories_embedding_hnsw 
-ON intelligent_memories USING hnsw (embedding vector_cosine_ops);
+-- Indexes half-precision copies of the embeddings (pgvector >= 0.7): half the index
+-- size and bytes per graph probe for a negligible loss in cosine recall.
+-- Embeddings are stored unit length, so the index uses inner product, which ranks
+-- like cosine without computing norms per comparison.
+-- Existing deployments:
+--   DROP INDEX IF EXISTS idx_intelligent_memories_embedding_hnsw;
+--   DROP INDEX IF EXISTS idx_intelligent_memories_embedding_halfvec_hnsw;
+--   UPDATE intelligent_memories SET embedding = l2_normalize(embedding) WHERE embedding IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_intelligent_memories_embedding_halfvec_ip_hnsw 
+ON intelligent_memories USING hnsw ((embedding::halfvec(1536)) halfvec_ip_ops);
 
 -- 6. Create other supporting tables
 CREATE TABLE IF NOT EXISTS user_files (
@@ -136,6 +169,15 @@ CREATE TABLE IF NOT EXISTS memory_topic_links (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Embeddings keyed by sha1 of the normalized text, stored as raw float32 bytes
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    text_hash CHAR(40) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    embedding BYTEA NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (text_hash, model)
+);
+
 -- 7. Create indexes for supporting tables
 CREATE INDEX IF NOT EXISTS idx_user_files_user_id ON user_files(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_tools_user_id ON user_tools(user_id);
@@ -143,6 +185,10 @@ CREATE INDEX IF NOT EXISTS idx_topics_user_id ON topics(user_id);
 CREATE INDEX IF NOT EXISTS idx_subtopics_user_id ON subtopics(user_id);
 CREATE INDEX IF NOT EXISTS idx_memory_topic_links_user_id ON memory_topic_links(user_id);
 
+-- Conversation list for a user, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_updated
+ON conversations (user_id, updated_at DESC);
+
 -- 8. Verify pgvector installation
 SELECT * FROM pg_extension WHERE extname = 'vector';
 
@@ -36,6 +36,10 @@ class DualIntelligentMemorySystem:
             content, user_id, conversation_id, message_type, message_id
         )
     
+    async def store_memories(self, memories: List[Dict]) -> List[Optional[str]]:
+        """Store several memories in one batch using PostgreSQL backend"""
+        return await self.active_system.store_memories(memories)
+    
     async def retrieve_memory(self, query: str, user_id: str, conversation_id: Optional[str], 
                             limit: int = 5) -> str:
         """Retrieve memory using PostgreSQL backend"""
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Form, Request, UploadFile, File
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, JSONResponse, Response
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse
 from starlette.middleware.sessions import SessionMiddleware
 # Memory API removed - using intelligent_memory directly
 from pydantic import BaseModel
@@ -9,12 +9,17 @@ from contextlib import asynccontextmanager
 # Git push for first cloud trigger 07/12/2025 11:46am
 import uvicorn
 import os
+import sys
 import httpx
 import hashlib
+import hmac
 import uuid
+import json
 import psycopg2
 import asyncio
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 
@@ -28,6 +33,11 @@ except ImportError:
 # Use environment variables
 SECRET_KEY = os.getenv("SECRET_KEY", "default-secret")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Validate required environment once at startup instead of on every connection
+if not DATABASE_URL:
+    print("❌ DATABASE_URL is not set - database features will be unavailable")
 
 # Initialize password context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -37,6 +47,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 async def lifespan(app: FastAPI):
     """Manage application lifespan"""
     # Startup
+    if not SKIP_SCHEMA_INIT:
+        await asyncio.to_thread(init_file_storage)
+    
     if intelligent_memory_system is not None:
         try:
             asyncio.create_task(start_background_riai())
@@ -53,6 +66,8 @@ async def lifespan(app: FastAPI):
             print("✅ Background RIAI service stopped")
         except Exception as e:
             print(f"❌ Failed to stop background RIAI service: {e}")
+    
+    await model_service.aclose()
 
 # Create FastAPI application
 app = FastAPI(title="NeuroLM Memory System", version="1.0.0", lifespan=lifespan)
@@ -197,13 +212,18 @@ except Exception as e:
     print(f"❌ Failed to initialize intelligent memory: {e}")
     intelligent_memory_system = None
 
+# Shared model service - one instance per process so the OpenRouter model
+# cache survives across requests instead of being rebuilt per call
+from model_service import get_model_service
+model_service = get_model_service()
+
 # Memory summarizer removed - replaced by RIAI quality-boosted retrieval
 
 # Note: Sessions cleared on restart - users need to re-login
 
 def get_db_connection():
     """Get PostgreSQL database connection"""
-    return psycopg2.connect(os.getenv("DATABASE_URL"))
+    return psycopg2.connect(DATABASE_URL)
 
 def init_file_storage():
     """Initialize all database tables"""
@@ -211,8 +231,10 @@ def init_file_storage():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Create users table
+        # Create every table in one round-trip; psycopg2 sends the whole script as a
+        # single simple query, which runs in the one transaction committed below
         cursor.execute('''
+            -- Create users table
             CREATE TABLE IF NOT EXISTS users (
                 id VARCHAR(255) PRIMARY KEY,
                 first_name VARCHAR(255) NOT NULL,
@@ -220,11 +242,9 @@ def init_file_storage():
                 email VARCHAR(255) UNIQUE NOT NULL,
                 password_hash VARCHAR(255) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create conversations table
-        cursor.execute('''
+            );
+            
+            -- Create conversations table
             CREATE TABLE IF NOT EXISTS conversations (
                 id VARCHAR(255) PRIMARY KEY,
                 user_id VARCHAR(255) NOT NULL,
@@ -235,11 +255,9 @@ def init_file_storage():
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 message_count INTEGER DEFAULT 0,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create conversation messages table
-        cursor.execute('''
+            );
+            
+            -- Create conversation messages table
             CREATE TABLE IF NOT EXISTS conversation_messages (
                 id SERIAL PRIMARY KEY,
                 conversation_id VARCHAR(255) NOT NULL,
@@ -247,11 +265,9 @@ def init_file_storage():
                 content TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create user files table
-        cursor.execute('''
+            );
+            
+            -- Create user files table
             CREATE TABLE IF NOT EXISTS user_files (
                 id SERIAL PRIMARY KEY,
                 user_id VARCHAR(255) NOT NULL,
@@ -260,11 +276,9 @@ def init_file_storage():
                 file_type VARCHAR(50),
                 uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create memory links table
-        cursor.execute('''
+            );
+            
+            -- Create memory links table
             CREATE TABLE IF NOT EXISTS memory_links (
                 id SERIAL PRIMARY KEY,
                 source_memory_id VARCHAR(255) NOT NULL,
@@ -272,11 +286,9 @@ def init_file_storage():
                 user_id VARCHAR(255) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create sessions table for persistent authentication
-        cursor.execute('''
+            );
+            
+            -- Create sessions table for persistent authentication
             CREATE TABLE IF NOT EXISTS sessions (
                 session_id VARCHAR(255) PRIMARY KEY,
                 user_id VARCHAR(255) NOT NULL,
@@ -284,11 +296,9 @@ def init_file_storage():
                 expires_at TIMESTAMP NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create user_tools table for custom tool storage
-        cursor.execute('''
+            );
+            
+            -- Create user_tools table for custom tool storage
             CREATE TABLE IF NOT EXISTS user_tools (
                 id SERIAL PRIMARY KEY,
                 user_id VARCHAR(255) NOT NULL,
@@ -302,7 +312,23 @@ def init_file_storage():
                 success_count INTEGER DEFAULT 0,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
                 UNIQUE(user_id, tool_name)
-            )
+            );
+            
+            -- Create embedding cache table shared by all instances
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                text_hash CHAR(40) NOT NULL,
+                model VARCHAR(100) NOT NULL,
+                embedding BYTEA NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (text_hash, model)
+            );
+            
+            -- Composite indexes matching the hot listing queries: a user's conversations
+            -- newest first, and a conversation's messages newest first
+            CREATE INDEX IF NOT EXISTS idx_conversations_user_updated
+            ON conversations (user_id, updated_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_conversation_messages_conversation_created
+            ON conversation_messages (conversation_id, created_at DESC);
         ''')
         
         conn.commit()
@@ -402,8 +428,11 @@ def update_tool_usage(user_id: str, tool_name: str, success: bool = True) -> boo
         if conn:
             conn.close()
 
-# Initialize file storage on startup
-init_file_storage()
+# Schema is initialized in the lifespan startup rather than at import, so importing
+# this module never opens a database connection. Deployments that run
+# `python main.py init-db` as a release step can set SKIP_SCHEMA_INIT=true to keep
+# DDL off instance startup
+SKIP_SCHEMA_INIT = os.getenv("SKIP_SCHEMA_INIT", "false").lower() == "true"
 
 
 
@@ -465,6 +494,31 @@ def update_conversation_topic(conversation_id: str, topic: Optional[str] = None,
         if conn:
             conn.close()
 
+def user_owns_conversation(user_id: str, conversation_id: str) -> bool:
+    """Check that a conversation belongs to a user without fetching any of its data"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT EXISTS (SELECT 1 FROM conversations WHERE id = %s AND user_id = %s)
+        """, (conversation_id, user_id))
+        
+        exists = cursor.fetchone()[0]
+        cursor.close()
+        return exists
+    except Exception as e:
+        print(f"Error checking conversation ownership: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+# Conversation list previews only show a short snippet, so truncate in SQL
+# rather than shipping whole messages to the client
+LAST_MESSAGE_PREVIEW_CHARS = 100
+
 def get_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic: Optional[str] = None, sub_topic: Optional[str] = None) -> Dict:
     """Get paginated conversations for a user with previews, optionally filtered by topic/subtopic"""
     conn = None
@@ -490,19 +544,15 @@ def get_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic
         
         where_clause = ' AND '.join(where_conditions)
         
-        # Get total count with filtering
-        count_query = f'SELECT COUNT(*) FROM conversations c WHERE {where_clause}'
-        cursor.execute(count_query, params)
-        count_result = cursor.fetchone()
-        total_count = count_result[0] if count_result and count_result[0] is not None else 0
-        
-        # Get paginated conversations with latest message preview and filtering
+        # Get paginated conversations with latest message preview and filtering;
+        # the window count returns the filtered total in the same round-trip
         main_query = f'''
             SELECT c.id, c.title, c.topic, c.sub_topic, c.created_at, c.updated_at, c.message_count,
-                   m.content as last_message, m.message_type as last_message_type
+                   m.content as last_message, m.message_type as last_message_type,
+                   COUNT(*) OVER() as total_count
             FROM conversations c
             LEFT JOIN LATERAL (
-                SELECT content, message_type 
+                SELECT LEFT(content, %s) as content, message_type 
                 FROM conversation_messages 
                 WHERE conversation_id = c.id 
                 ORDER BY created_at DESC 
@@ -513,10 +563,21 @@ def get_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic
             LIMIT %s OFFSET %s
         '''
         
-        cursor.execute(main_query, params + [limit, offset])
+        cursor.execute(main_query, [LAST_MESSAGE_PREVIEW_CHARS] + params + [limit, offset])
+        rows = cursor.fetchall()
+        
+        if rows:
+            total_count = rows[0][9]
+        elif offset > 0:
+            # Page past the end returns no rows, so the window count is unavailable
+            cursor.execute(f'SELECT COUNT(*) FROM conversations c WHERE {where_clause}', params)
+            count_result = cursor.fetchone()
+            total_count = count_result[0] if count_result and count_result[0] is not None else 0
+        else:
+            total_count = 0
         
         conversations = []
-        for row in cursor.fetchall():
+        for row in rows:
             conversations.append({
                 'id': row[0],
                 'title': row[1],
@@ -544,38 +605,44 @@ def get_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic
         if conn:
             conn.close()
 
+def _insert_conversation_message(cursor, conversation_id: str, message_type: str, content: str) -> int:
+    """Insert a message and bump the conversation counters using an open cursor"""
+    # Insert message and return the generated ID
+    cursor.execute('''
+        INSERT INTO conversation_messages (conversation_id, message_type, content, created_at)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id
+    ''', (conversation_id, message_type, content, datetime.now()))
+    
+    result = cursor.fetchone()
+    if not result:
+        raise Exception("Failed to insert message")
+    message_id = result[0]
+    
+    # Update conversation message count and timestamp, reading back the new count
+    cursor.execute('''
+        UPDATE conversations 
+        SET message_count = message_count + 1, updated_at = %s
+        WHERE id = %s
+        RETURNING message_count
+    ''', (datetime.now(), conversation_id))
+    count_result = cursor.fetchone()
+    
+    # Update conversation title if it's the first user message
+    if message_type == 'user':
+        if count_result and count_result[0] is not None and count_result[0] == 1:  # First message, update title
+            title = content[:50] + "..." if len(content) > 50 else content
+            cursor.execute('UPDATE conversations SET title = %s WHERE id = %s', (title, conversation_id))
+    
+    return message_id
+
 def save_conversation_message(conversation_id: str, message_type: str, content: str):
     """Save a message to a conversation"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Insert message and return the generated ID
-        cursor.execute('''
-            INSERT INTO conversation_messages (conversation_id, message_type, content, created_at)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-        ''', (conversation_id, message_type, content, datetime.now()))
-        
-        result = cursor.fetchone()
-        if not result:
-            raise Exception("Failed to insert message")
-        message_id = result[0]
-        
-        # Update conversation message count and timestamp
-        cursor.execute('''
-            UPDATE conversations 
-            SET message_count = message_count + 1, updated_at = %s
-            WHERE id = %s
-        ''', (datetime.now(), conversation_id))
-        
-        # Update conversation title if it's the first user message
-        if message_type == 'user':
-            cursor.execute('SELECT message_count FROM conversations WHERE id = %s', (conversation_id,))
-            count_result = cursor.fetchone()
-            if count_result and count_result[0] is not None and count_result[0] == 1:  # First message, update title
-                title = content[:50] + "..." if len(content) > 50 else content
-                cursor.execute('UPDATE conversations SET title = %s WHERE id = %s', (title, conversation_id))
+        message_id = _insert_conversation_message(cursor, conversation_id, message_type, content)
         
         conn.commit()
         cursor.close()
@@ -585,42 +652,77 @@ def save_conversation_message(conversation_id: str, message_type: str, content:
         print(f"Error saving message: {e}")
         return None
 
+def save_conversation_turn(conversation_id: str, user_content: str, assistant_content: str) -> tuple:
+    """Save a user message and assistant reply on one connection in a single transaction"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        user_message_id = _insert_conversation_message(cursor, conversation_id, 'user', user_content)
+        assistant_message_id = _insert_conversation_message(cursor, conversation_id, 'assistant', assistant_content)
+        
+        conn.commit()
+        cursor.close()
+        return user_message_id, assistant_message_id
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Error saving conversation turn: {e}")
+        return None, None
+    finally:
+        if conn:
+            conn.close()
+
+# Upper bound on a single page of conversation history
+MAX_MESSAGES_PAGE_SIZE = 100
+
 def get_conversation_messages(conversation_id: str, limit: int = 30, before_id: Optional[str] = None) -> Dict:
     """Get paginated messages for a conversation"""
+    limit = max(1, min(limit, MAX_MESSAGES_PAGE_SIZE))
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get total message count
-        cursor.execute('SELECT COUNT(*) FROM conversation_messages WHERE conversation_id = %s', (conversation_id,))
-        count_result = cursor.fetchone()
-        total_count = count_result[0] if count_result and count_result[0] is not None else 0
-        
+        # Fetch one extra row to learn whether older messages exist without a second query;
+        # the total message count rides along as a once-evaluated scalar subquery
         if before_id:
             # Load messages before a specific message ID
             cursor.execute('''
-                SELECT m1.id, m1.message_type, m1.content, m1.created_at
+                SELECT m1.id, m1.message_type, m1.content, m1.created_at,
+                       (SELECT COUNT(*) FROM conversation_messages WHERE conversation_id = %s) as total_count
                 FROM conversation_messages m1
                 JOIN conversation_messages m2 ON m2.id = %s AND m2.conversation_id = %s
                 WHERE m1.conversation_id = %s AND m1.created_at < m2.created_at
                 ORDER BY m1.created_at DESC
                 LIMIT %s
-            ''', (before_id, conversation_id, conversation_id, limit))
-            
-            # Reverse to get chronological order
-            rows = list(reversed(cursor.fetchall()))
+            ''', (conversation_id, before_id, conversation_id, conversation_id, limit + 1))
         else:
             # Load most recent messages
             cursor.execute('''
-                SELECT id, message_type, content, created_at
+                SELECT id, message_type, content, created_at,
+                       (SELECT COUNT(*) FROM conversation_messages WHERE conversation_id = %s) as total_count
                 FROM conversation_messages
                 WHERE conversation_id = %s
                 ORDER BY created_at DESC
                 LIMIT %s
-            ''', (conversation_id, limit))
-            
-            # Reverse to get chronological order
-            rows = list(reversed(cursor.fetchall()))
+            ''', (conversation_id, conversation_id, limit + 1))
+        
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        
+        if rows:
+            total_count = rows[0][4]
+        elif before_id:
+            # Nothing older than before_id, so the count has to be fetched on its own
+            cursor.execute('SELECT COUNT(*) FROM conversation_messages WHERE conversation_id = %s', (conversation_id,))
+            count_result = cursor.fetchone()
+            total_count = count_result[0] if count_result and count_result[0] is not None else 0
+        else:
+            total_count = 0
+        
+        # Reverse to get chronological order
+        rows = list(reversed(rows[:limit]))
         
         messages = []
         for row in rows:
@@ -634,21 +736,6 @@ def get_conversation_messages(conversation_id: str, limit: int = 30, before_id:
         cursor.close()
         conn.close()
         
-        # Check if there are more messages before the oldest returned message
-        has_more = False
-        if messages:
-            oldest_id = messages[0]['id']
-            cursor = get_db_connection().cursor()
-            cursor.execute('''
-                SELECT COUNT(*) FROM conversation_messages 
-                WHERE conversation_id = %s AND created_at < (
-                    SELECT created_at FROM conversation_messages WHERE id = %s
-                )
-            ''', (conversation_id, oldest_id))
-            more_result = cursor.fetchone()
-            has_more = more_result[0] > 0 if more_result and more_result[0] is not None else False
-            cursor.close()
-        
         return {
             'messages': messages,
             'total_count': total_count,
@@ -700,18 +787,17 @@ def get_all_topics(user_id: str) -> Dict:
             ORDER BY topic, sub_topic
         ''', (user_id,))
         
-        topics = {}
-        for row in cursor.fetchall():
-            topic = row[0]
-            sub_topic = row[1]
-            if topic not in topics:
-                topics[topic] = []
-            if sub_topic and sub_topic not in topics[topic]:
-                topics[topic].append(sub_topic)
+        # DISTINCT already makes each (topic, sub_topic) pair unique, so sub-topics
+        # can be appended without a membership scan
+        topics = defaultdict(list)
+        for topic, sub_topic in cursor.fetchall():
+            sub_topics = topics[topic]
+            if sub_topic:
+                sub_topics.append(sub_topic)
         
         cursor.close()
         conn.close()
-        return topics
+        return dict(topics)
     except Exception as e:
         print(f"Error getting topics: {e}")
         return {}
@@ -743,24 +829,17 @@ def create_topic_entry(user_id: str, topic: str) -> bool:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Check if topic already exists
-        cursor.execute('''
-            SELECT COUNT(*) FROM conversations 
-            WHERE user_id = %s AND topic = %s
-        ''', (user_id, topic))
-        
-        exists_result = cursor.fetchone()
-        if exists_result and exists_result[0] is not None and exists_result[0] > 0:
-            cursor.close()
-            conn.close()
-            return True  # Topic already exists
-        
-        # Create a placeholder conversation for the topic
+        # Create a placeholder conversation for the topic unless the topic already
+        # exists, checking and inserting in one statement
         conversation_id = str(uuid.uuid4())
         cursor.execute('''
             INSERT INTO conversations (id, user_id, title, topic, created_at, updated_at, message_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ''', (conversation_id, user_id, f"[Topic: {topic}]", topic, datetime.now(), datetime.now(), 0))
+            SELECT %s, %s, %s, %s, NOW(), NOW(), 0
+            WHERE NOT EXISTS (
+                SELECT 1 FROM conversations 
+                WHERE user_id = %s AND topic = %s
+            )
+        ''', (conversation_id, user_id, f"[Topic: {topic}]", topic, user_id, topic))
         
         conn.commit()
         cursor.close()
@@ -776,31 +855,34 @@ def create_subtopic_entry(user_id: str, topic: str, sub_topic: str) -> bool:
         topic = topic.lower().strip()
         sub_topic = sub_topic.lower().strip()
         
-        # Check sub-topic limit
-        if get_sub_topic_count(user_id, topic) >= 5:
-            return False
-        
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Check if sub-topic already exists
+        # Check the sub-topic limit, check whether the sub-topic already exists and
+        # create its placeholder conversation in one statement
+        conversation_id = str(uuid.uuid4())
         cursor.execute('''
-            SELECT COUNT(*) FROM conversations 
-            WHERE user_id = %s AND topic = %s AND sub_topic = %s
-        ''', (user_id, topic, sub_topic))
+            WITH existing AS (
+                SELECT COUNT(DISTINCT sub_topic) AS sub_topic_count,
+                       COALESCE(BOOL_OR(sub_topic = %s), FALSE) AS already_exists
+                FROM conversations
+                WHERE user_id = %s AND topic = %s AND sub_topic IS NOT NULL
+            ), created AS (
+                INSERT INTO conversations (id, user_id, title, topic, sub_topic, created_at, updated_at, message_count)
+                SELECT %s, %s, %s, %s, %s, NOW(), NOW(), 0
+                FROM existing
+                WHERE sub_topic_count < 5 AND NOT already_exists
+                RETURNING id
+            )
+            SELECT sub_topic_count FROM existing
+        ''', (sub_topic, user_id, topic,
+              conversation_id, user_id, f"[Sub-topic: {topic} → {sub_topic}]", topic, sub_topic))
         
-        subtopic_exists_result = cursor.fetchone()
-        if subtopic_exists_result and subtopic_exists_result[0] is not None and subtopic_exists_result[0] > 0:
+        sub_topic_count = cursor.fetchone()[0]
+        if sub_topic_count >= 5:
             cursor.close()
             conn.close()
-            return True  # Sub-topic already exists
-        
-        # Create a placeholder conversation for the sub-topic
-        conversation_id = str(uuid.uuid4())
-        cursor.execute('''
-            INSERT INTO conversations (id, user_id, title, topic, sub_topic, created_at, updated_at, message_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (conversation_id, user_id, f"[Sub-topic: {topic} → {sub_topic}]", topic, sub_topic, datetime.now(), datetime.now(), 0))
+            return False  # Sub-topic limit reached
         
         conn.commit()
         cursor.close()
@@ -823,13 +905,13 @@ def cleanup_placeholder_conversations(user_id: str, topic: Optional[str], sub_to
         topic = topic.lower().strip()
         sub_topic = sub_topic.lower().strip() if sub_topic else None
         
-        # Find placeholder conversations that match exactly
+        # Delete placeholder conversations that match exactly in a single statement
         # Placeholders have 0 messages and specific title patterns
         if sub_topic:
             # Looking for subtopic placeholder: [Sub-topic: topic → sub_topic]
             placeholder_title = f"[Sub-topic: {topic} → {sub_topic}]"
             cursor.execute('''
-                SELECT id FROM conversations 
+                DELETE FROM conversations 
                 WHERE user_id = %s AND topic = %s AND sub_topic = %s 
                 AND message_count = 0 AND title = %s
             ''', (user_id, topic, sub_topic, placeholder_title))
@@ -837,18 +919,12 @@ def cleanup_placeholder_conversations(user_id: str, topic: Optional[str], sub_to
             # Looking for topic placeholder: [Topic: topic]
             placeholder_title = f"[Topic: {topic}]"
             cursor.execute('''
-                SELECT id FROM conversations 
+                DELETE FROM conversations 
                 WHERE user_id = %s AND topic = %s AND sub_topic IS NULL 
                 AND message_count = 0 AND title = %s
             ''', (user_id, topic, placeholder_title))
         
-        placeholder_ids = [row[0] for row in cursor.fetchall()]
-        
-        # Delete the placeholder conversations
-        deleted_count = 0
-        for placeholder_id in placeholder_ids:
-            cursor.execute('DELETE FROM conversations WHERE id = %s', (placeholder_id,))
-            deleted_count += cursor.rowcount
+        deleted_count = cursor.rowcount
         
         conn.commit()
         cursor.close()
@@ -871,23 +947,15 @@ def create_memory_link(memory_id: str, linked_topic: str, user_id: str) -> bool:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Check if link already exists
-        cursor.execute('''
-            SELECT COUNT(*) FROM memory_links 
-            WHERE source_memory_id = %s AND linked_topic = %s AND user_id = %s
-        ''', (memory_id, linked_topic.lower(), user_id))
-        
-        link_exists_result = cursor.fetchone()
-        if link_exists_result and link_exists_result[0] is not None and link_exists_result[0] > 0:
-            cursor.close()
-            conn.close()
-            return True  # Link already exists
-        
-        # Create new link
+        # Create the link unless it already exists, in one statement
         cursor.execute('''
             INSERT INTO memory_links (source_memory_id, linked_topic, user_id, created_at)
-            VALUES (%s, %s, %s, %s)
-        ''', (memory_id, linked_topic.lower(), user_id, datetime.now()))
+            SELECT %s, %s, %s, NOW()
+            WHERE NOT EXISTS (
+                SELECT 1 FROM memory_links 
+                WHERE source_memory_id = %s AND linked_topic = %s AND user_id = %s
+            )
+        ''', (memory_id, linked_topic.lower(), user_id, memory_id, linked_topic.lower(), user_id))
         
         conn.commit()
         cursor.close()
@@ -903,15 +971,20 @@ def remove_topic_links(current_topic: str, linked_topic: str, user_id: str) -> b
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Remove links where memories from current_topic are linked to linked_topic
+        # Remove links where memories from current_topic are linked to linked_topic.
+        # The topic's messages are only tested for existence, so the user's memories
+        # are never joined against every message (a memories x messages product)
         cursor.execute('''
             DELETE FROM memory_links 
             WHERE linked_topic = %s AND user_id = %s
             AND source_memory_id IN (
-                SELECT DISTINCT m.id FROM conversations c
-                JOIN conversation_messages msg ON c.id = msg.conversation_id
-                JOIN intelligent_memories m ON m.user_id = %s
-                WHERE c.topic = %s
+                SELECT m.id::text FROM intelligent_memories m
+                WHERE m.user_id = %s
+                AND EXISTS (
+                    SELECT 1 FROM conversations c
+                    JOIN conversation_messages msg ON c.id = msg.conversation_id
+                    WHERE c.topic = %s
+                )
             )
         ''', (linked_topic.lower(), user_id, user_id, current_topic.lower()))
         
@@ -954,11 +1027,12 @@ def get_topic_deletion_info(user_id: str, topic: str) -> Dict:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get conversation count and subtopics
+        # Get conversation count, message total and subtopic list in one round-trip
         cursor.execute('''
             SELECT COUNT(*) as conversation_count,
                    COUNT(DISTINCT sub_topic) as subtopic_count,
-                   COALESCE(SUM(message_count), 0) as total_messages
+                   COALESCE(SUM(message_count), 0) as total_messages,
+                   ARRAY_AGG(DISTINCT sub_topic) FILTER (WHERE sub_topic IS NOT NULL) as subtopics
             FROM conversations
             WHERE user_id = %s AND topic = %s
         ''', (user_id, topic))
@@ -972,15 +1046,7 @@ def get_topic_deletion_info(user_id: str, topic: str) -> Dict:
         conversation_count = result[0] if result[0] is not None else 0
         subtopic_count = result[1] if result[1] is not None and result[1] > 0 else 0
         total_messages = result[2] if result[2] is not None else 0
-        
-        # Get list of subtopics
-        cursor.execute('''
-            SELECT DISTINCT sub_topic
-            FROM conversations
-            WHERE user_id = %s AND topic = %s AND sub_topic IS NOT NULL
-        ''', (user_id, topic))
-        
-        subtopics = [row[0] for row in cursor.fetchall()]
+        subtopics = result[3] or []
         
         cursor.close()
         conn.close()
@@ -1068,11 +1134,10 @@ def delete_topic_and_data(user_id: str, topic: str) -> bool:
             ''', (user_id, topic))
             
             # 2. Delete conversation messages
-            for conv_id in conversation_ids:
-                cursor.execute('''
-                    DELETE FROM conversation_messages
-                    WHERE conversation_id = %s
-                ''', (conv_id,))
+            cursor.execute('''
+                DELETE FROM conversation_messages
+                WHERE conversation_id = ANY(%s)
+            ''', (conversation_ids,))
             
             # 3. Delete conversations
             cursor.execute('''
@@ -1132,11 +1197,10 @@ def delete_subtopic_and_data(user_id: str, topic: str, subtopic: str) -> bool:
         try:
             # Delete from PostgreSQL in proper order
             # 1. Delete conversation messages
-            for conv_id in conversation_ids:
-                cursor.execute('''
-                    DELETE FROM conversation_messages
-                    WHERE conversation_id = %s
-                ''', (conv_id,))
+            cursor.execute('''
+                DELETE FROM conversation_messages
+                WHERE conversation_id = ANY(%s)
+            ''', (conversation_ids,))
             
             # 2. Delete conversations
             cursor.execute('''
@@ -1169,6 +1233,20 @@ def delete_subtopic_and_data(user_id: str, topic: str, subtopic: str) -> bool:
         print(f"Error deleting subtopic: {e}")
         return False
 
+# Chat system prompt - static prefix kept identical across turns for provider prompt caching
+SYSTEM_PROMPT_PREFIX = """You are a helpful AI assistant with access to the conversation history you share with the user.
+
+Instructions:
+- Use the conversation history provided below to maintain continuity
+- Reference specific details from previous conversations when relevant
+- Be consistent with what you remember from past interactions
+- If the user asks about previous conversations, refer to the actual content provided
+- Do not contradict information from your previous responses shown in the history"""
+
+MEMORY_CONTEXT_TEMPLATE = """IMPORTANT: The following are actual previous conversations and messages from your chat history with {user_name}. These are REAL memories, not hypothetical:
+
+{context}"""
+
 # Chat models - define before usage
 class ChatMessage(BaseModel):
     message: str
@@ -1183,9 +1261,14 @@ class ChatResponse(BaseModel):
     conversation_id: str
     assistant_message_id: Optional[str] = None
     deletion_info: Optional[Dict] = None
+    turn_saved: bool = False
 
 # Slash command handler
 async def handle_slash_command(command: str, user_id: str, conversation_id: str) -> ChatResponse:
+    """Handle slash commands without blocking the event loop on database work"""
+    return await asyncio.to_thread(run_slash_command, command, user_id, conversation_id)
+
+def run_slash_command(command: str, user_id: str, conversation_id: str) -> ChatResponse:
     """Handle slash commands for file management"""
     parts = command.strip().split()
     cmd = parts[0].lower()
@@ -1203,11 +1286,11 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
             if not files:
                 response = "No files uploaded yet. Use the + button to upload files."
             else:
-                response = "**Your uploaded files:**\n\n"
-                for filename, file_type, uploaded_at in files:
-                    date = uploaded_at.strftime("%Y-%m-%d %H:%M")
-                    response += f"• `{filename}` ({file_type}) - {date}\n"
-                response += f"\nUse `/view [filename]` to display file content."
+                lines = [
+                    f"• `{filename}` ({file_type}) - {uploaded_at.strftime('%Y-%m-%d %H:%M')}\n"
+                    for filename, file_type, uploaded_at in files
+                ]
+                response = "**Your uploaded files:**\n\n" + "".join(lines) + "\nUse `/view [filename]` to display file content."
             
         elif cmd == '/view':
             if len(parts) < 2:
@@ -1259,10 +1342,11 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 if not files:
                     response = f"No files found matching '{search_term}'."
                 else:
-                    response = f"**Files matching '{search_term}':**\n\n"
-                    for filename, file_type, uploaded_at in files:
-                        date = uploaded_at.strftime("%Y-%m-%d %H:%M")
-                        response += f"• `{filename}` ({file_type}) - {date}\n"
+                    lines = [
+                        f"• `{filename}` ({file_type}) - {uploaded_at.strftime('%Y-%m-%d %H:%M')}\n"
+                        for filename, file_type, uploaded_at in files
+                    ]
+                    response = f"**Files matching '{search_term}':**\n\n" + "".join(lines)
         
         elif cmd == '/download':
             if len(parts) < 2:
@@ -1288,15 +1372,15 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
             if not topics:
                 response = "No topics created yet. Start a conversation with a topic to organize your chats."
             else:
-                response = "**Your Topics:**\n\n"
+                lines = ["**Your Topics:**\n\n"]
                 for topic, sub_topics in topics.items():
-                    response += f"• **{topic}**\n"
+                    lines.append(f"• **{topic}**\n")
                     if sub_topics:
-                        for sub_topic in sub_topics:
-                            response += f"  - {sub_topic}\n"
+                        lines.extend(f"  - {sub_topic}\n" for sub_topic in sub_topics)
                     else:
-                        response += f"  - (no sub-topics)\n"
-                response += "\nUse topics when creating new conversations to organize your chats."
+                        lines.append("  - (no sub-topics)\n")
+                lines.append("\nUse topics when creating new conversations to organize your chats.")
+                response = "".join(lines)
         
         elif cmd == '/link':
             if len(parts) < 2:
@@ -1416,14 +1500,14 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
             response = "**Available commands:**\n\n• `/files` - List all uploaded files\n• `/view [filename]` - Display file content\n• `/delete [filename]` - Delete a file\n• `/search [term]` - Search files by name\n• `/download [filename]` - Download a file\n• `/topics` - List all topics and sub-topics\n• `/link [topic]` - Link current message to specified topic\n• `/unlink [topic]` - Remove links between topics\n• `/delete-topic [topic]` - Delete a topic and all its data\n• `/delete-subtopic [topic] [subtopic]` - Delete a subtopic and all its data"
         
         # Save command and response to conversation
-        save_conversation_message(conversation_id, 'user', command)
-        save_conversation_message(conversation_id, 'assistant', response)
+        _, assistant_message_id = save_conversation_turn(conversation_id, command, response)
         
         return ChatResponse(
             response=response,
             memory_stored=False,
             context_used=0,
-            conversation_id=conversation_id
+            conversation_id=conversation_id,
+            turn_saved=assistant_message_id is not None
         )
         
     except Exception as e:
@@ -1503,7 +1587,7 @@ def verify_user_login(username: str, password: str) -> Optional[str]:
         else:
             # Legacy SHA256 hash - verify and migrate if successful
             legacy_hash = hashlib.sha256(password.encode()).hexdigest()
-            if legacy_hash == stored_hash:
+            if hmac.compare_digest(legacy_hash, stored_hash):
                 # Password is correct, migrate to BCrypt
                 new_hash = pwd_context.hash(password)
                 cursor.execute(
@@ -1525,8 +1609,29 @@ def verify_user_login(username: str, password: str) -> Optional[str]:
         print(f"Error verifying login: {e}")
         return None
 
+# Short-lived LRU of user first names - read on every chat turn but rarely changed.
+# Bounded so a long-running process doesn't keep an entry for every user it has seen
+FIRST_NAME_CACHE_TTL = 300  # seconds
+FIRST_NAME_CACHE_SIZE = int(os.getenv("FIRST_NAME_CACHE_SIZE", "4096"))
+_first_name_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+def cache_user_first_name(user_id: str, first_name: str):
+    """Add a first name to the LRU, evicting the oldest entry when full"""
+    _first_name_cache[user_id] = (first_name, time.monotonic())
+    _first_name_cache.move_to_end(user_id)
+    while len(_first_name_cache) > FIRST_NAME_CACHE_SIZE:
+        _first_name_cache.popitem(last=False)
+
 def get_user_first_name(user_id: str) -> Optional[str]:
     """Get user's first name by user ID"""
+    cached = _first_name_cache.get(user_id)
+    if cached:
+        if time.monotonic() - cached[1] < FIRST_NAME_CACHE_TTL:
+            _first_name_cache.move_to_end(user_id)
+            return cached[0]
+        # Expired entries are dropped on read
+        _first_name_cache.pop(user_id, None)
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -1534,7 +1639,10 @@ def get_user_first_name(user_id: str) -> Optional[str]:
         result = cursor.fetchone()
         cursor.close()
         conn.close()
-        return result[0] if result else None
+        first_name = result[0] if result else None
+        if first_name:
+            cache_user_first_name(user_id, first_name)
+        return first_name
     except Exception as e:
         print(f"Error getting user first name: {e}")
         return None
@@ -1543,241 +1651,7 @@ def get_user_first_name(user_id: str) -> Optional[str]:
 @app.get("/register")
 async def register_page():
     """Serve registration page"""
-    return HTMLResponse("""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>NeuroLM - Register</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: #000000;
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                position: relative;
-                overflow-y: auto;
-                padding: 1rem 0;
-            }
-            
-            .background-pattern {
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                background-image: url('/static/neural-brain-logo.png');
-                background-size: 40%;
-                background-position: center;
-                background-repeat: no-repeat;
-                opacity: 0.05;
-                filter: blur(1px);
-                z-index: 0;
-            }
-            
-            .register-container {
-                background: rgba(0, 0, 0, 0.95);
-                backdrop-filter: blur(10px);
-                border: 1px solid rgba(102, 126, 234, 0.3);
-                border-radius: 20px;
-                padding: 2.5rem;
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.4);
-                width: 100%;
-                max-width: 420px;
-                position: relative;
-                z-index: 1;
-                transition: all 0.3s ease;
-            }
-            .logo {
-                text-align: center;
-                margin-bottom: 2rem;
-            }
-            .logo h1 {
-                background: linear-gradient(135deg, 
-                    #667eea 0%, 
-                    #764ba2 25%, 
-                    #667eea 50%, 
-                    #a855f7 75%, 
-                    #667eea 100%);
-                background-size: 200% 200%;
-                background-clip: text;
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-                margin: 0;
-                font-size: 2rem;
-                font-weight: 700;
-                animation: iridescent 3s ease-in-out infinite;
-                filter: drop-shadow(0 0 10px rgba(102, 126, 234, 0.3));
-                text-shadow: 0 0 20px rgba(102, 126, 234, 0.5);
-            }
-            .logo p {
-                color: #ffffff !important;
-                font-size: 1.2rem;
-                font-weight: 500;
-                margin-top: 0.5rem;
-                margin-bottom: 0;
-            }
-            
-            @keyframes iridescent {
-                0%, 100% { background-position: 0% 50%; }
-                50% { background-position: 100% 50%; }
-            }
-            .form-group {
-                margin-bottom: 1.5rem;
-            }
-            label {
-                display: block;
-                margin-bottom: 0.5rem;
-                color: #e5e7eb;
-                font-weight: 500;
-            }
-            input[type="text"], input[type="email"], input[type="password"] {
-                width: 100%;
-                padding: 0.875rem 1rem;
-                background: rgba(42, 42, 42, 0.8);
-                border: 1px solid #404040;
-                border-radius: 12px;
-                font-size: 1rem;
-                color: #ffffff;
-                transition: all 0.3s ease;
-                box-sizing: border-box;
-            }
-            input[type="text"]:focus, input[type="email"]:focus, input[type="password"]:focus {
-                outline: none;
-                border-color: #667eea;
-                box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-                background: rgba(42, 42, 42, 1);
-            }
-            .submit-btn {
-                width: 100%;
-                padding: 0.75rem;
-                background: linear-gradient(135deg, 
-                    rgba(102, 126, 234, 0.3) 0%, 
-                    rgba(118, 75, 162, 0.3) 50%, 
-                    rgba(168, 85, 247, 0.3) 100%);
-                backdrop-filter: blur(10px);
-                border: 2px solid transparent;
-                border-radius: 12px;
-                font-size: 1rem;
-                font-weight: 600;
-                cursor: pointer;
-                color: white;
-                position: relative;
-                overflow: hidden;
-                transition: all 0.3s ease;
-                box-shadow: 
-                    0 4px 15px rgba(102, 126, 234, 0.3),
-                    inset 0 1px 0 rgba(255, 255, 255, 0.1);
-            }
-            
-            .submit-btn::before {
-                content: '';
-                position: absolute;
-                top: 0;
-                left: -100%;
-                width: 100%;
-                height: 100%;
-                background: linear-gradient(90deg, 
-                    transparent, 
-                    rgba(255, 255, 255, 0.3), 
-                    transparent);
-                transition: left 0.6s;
-            }
-            
-            .submit-btn:hover::before {
-                left: 100%;
-            }
-            
-            .submit-btn:hover {
-                transform: translateY(-2px);
-                box-shadow: 
-                    0 6px 20px rgba(102, 126, 234, 0.4),
-                    inset 0 1px 0 rgba(255, 255, 255, 0.2);
-                border-color: rgba(102, 126, 234, 0.5);
-            }
-            .submit-btn:hover {
-                background: #3a5a95;
-            }
-            .login-link {
-                text-align: center;
-                margin-top: 1.5rem;
-            }
-            .login-link p {
-                color: #e5e7eb;
-                font-size: 0.9rem;
-            }
-            .login-link a {
-                color: #667eea;
-                text-decoration: none;
-            }
-            .error {
-                color: #e74c3c;
-                font-size: 0.9rem;
-                margin-top: 0.5rem;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="register-container">
-            <div class="logo">
-                <img src="/static/neurolm-glass-logo.png" alt="NeuroLM" style="max-width: 240px; height: auto;">
-                <p>Create Your Account</p>
-            </div>
-            <form action="/register" method="post" onsubmit="return validateForm()">
-                <div class="form-group">
-                    <label for="first_name">First Name / Preferred Name:</label>
-                    <input type="text" id="first_name" name="first_name" required>
-                </div>
-                <div class="form-group">
-                    <label for="username">Username:</label>
-                    <input type="text" id="username" name="username" required>
-                </div>
-                <div class="form-group">
-                    <label for="email">Email:</label>
-                    <input type="email" id="email" name="email" required>
-                </div>
-                <div class="form-group">
-                    <label for="password">Password:</label>
-                    <input type="password" id="password" name="password" required>
-                </div>
-                <div class="form-group">
-                    <label for="confirm_password">Confirm Password:</label>
-                    <input type="password" id="confirm_password" name="confirm_password" required>
-                    <div id="password-error" class="error" style="display: none;">Passwords do not match</div>
-                </div>
-                <button type="submit" class="submit-btn">Create Account</button>
-            </form>
-            <div class="login-link">
-                <p>Already have an account? <a href="/login">Sign in here</a></p>
-            </div>
-        </div>
-        
-        <script>
-            function validateForm() {
-                const password = document.getElementById('password').value;
-                const confirmPassword = document.getElementById('confirm_password').value;
-                const errorDiv = document.getElementById('password-error');
-                
-                if (password !== confirmPassword) {
-                    errorDiv.style.display = 'block';
-                    return false;
-                }
-                errorDiv.style.display = 'none';
-                return true;
-            }
-        </script>
-    </body>
-    </html>
-    """)
+    return FileResponse("register.html")
 
 @app.post("/register")
 async def register_user(
@@ -1820,411 +1694,7 @@ async def register_user(
 @app.get("/login")
 async def login_page():
     """Serve login page"""
-    return HTMLResponse("""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>NeuroLM - Login</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: #000000;
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                position: relative;
-                overflow-y: auto;
-                padding: 1rem 0;
-            }
-            
-            /* Subtle brain pattern background */
-            .background-pattern {
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                background-image: url('/static/neural-brain-logo.png');
-                background-size: 40%;
-                background-position: center;
-                background-repeat: no-repeat;
-                opacity: 0.05;
-                filter: blur(1px);
-                z-index: 0;
-            }
-            
-            /* Floating login card */
-            .login-container {
-                background: rgba(0, 0, 0, 0.95);
-                backdrop-filter: blur(20px);
-                border: 2px solid;
-                border-image: linear-gradient(135deg, 
-                    rgba(102, 126, 234, 0.6) 0%, 
-                    rgba(118, 75, 162, 0.6) 25%, 
-                    rgba(168, 85, 247, 0.6) 50%, 
-                    rgba(102, 126, 234, 0.6) 100%) 1;
-                border-radius: 20px;
-                padding: 2.5rem;
-                box-shadow: 
-                    0 20px 40px rgba(0, 0, 0, 0.4),
-                    inset 0 1px 0 rgba(255, 255, 255, 0.1),
-                    0 0 0 1px rgba(102, 126, 234, 0.3);
-                width: 100%;
-                max-width: 420px;
-                position: relative;
-                z-index: 1;
-                transition: all 0.3s ease;
-            }
-            
-            .login-container:hover {
-                border-color: rgba(102, 126, 234, 0.5);
-                box-shadow: 0 25px 50px rgba(0, 0, 0, 0.6);
-            }
-            
-            .logo {
-                text-align: center;
-                margin-bottom: 2.5rem;
-            }
-            
-            .logo h1 {
-                background: linear-gradient(135deg, 
-                    #667eea 0%, 
-                    #764ba2 25%, 
-                    #667eea 50%, 
-                    #a855f7 75%, 
-                    #667eea 100%);
-                background-size: 200% 200%;
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-                background-clip: text;
-                margin: 0;
-                font-size: 2.5rem;
-                font-weight: 700;
-                letter-spacing: -0.025em;
-                animation: iridescent 3s ease-in-out infinite;
-                filter: drop-shadow(0 0 10px rgba(102, 126, 234, 0.3));
-                text-shadow: 0 0 20px rgba(102, 126, 234, 0.5);
-            }
-            
-            @keyframes iridescent {
-                0%, 100% { background-position: 0% 50%; }
-                50% { background-position: 100% 50%; }
-            }
-            
-            .logo p {
-                color: #9ca3af;
-                margin-top: 0.5rem;
-                font-size: 1rem;
-            }
-            
-            .form-group {
-                margin-bottom: 1.5rem;
-            }
-            
-            label {
-                display: block;
-                margin-bottom: 0.5rem;
-                color: #e5e7eb;
-                font-weight: 500;
-                font-size: 0.9rem;
-            }
-            
-            input[type="text"], input[type="password"] {
-                width: 100%;
-                padding: 0.875rem 1rem;
-                background: rgba(42, 42, 42, 0.8);
-                border: 1px solid #404040;
-                border-radius: 12px;
-                font-size: 1rem;
-                color: #ffffff;
-                transition: all 0.3s ease;
-                box-sizing: border-box;
-            }
-            
-            input[type="text"]:focus, input[type="password"]:focus {
-                outline: none;
-                border-color: #667eea;
-                box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-                background: rgba(42, 42, 42, 1);
-            }
-            
-            input[type="text"]::placeholder, input[type="password"]::placeholder {
-                color: #6b7280;
-            }
-            
-            .remember-me {
-                display: flex;
-                align-items: center;
-                margin-bottom: 1.5rem;
-                gap: 0.5rem;
-            }
-            
-            .remember-me input[type="checkbox"] {
-                width: auto;
-                margin: 0;
-                accent-color: #667eea;
-            }
-            
-            .remember-me label {
-                margin: 0;
-                font-size: 0.875rem;
-                color: #9ca3af;
-                cursor: pointer;
-            }
-            
-            .submit-btn {
-                width: 100%;
-                padding: 1rem 2rem;
-                background: linear-gradient(135deg, 
-                    rgba(20, 30, 60, 0.4) 0%, 
-                    rgba(40, 50, 100, 0.3) 50%, 
-                    rgba(20, 30, 60, 0.4) 100%);
-                backdrop-filter: blur(20px);
-                border: 2px solid transparent;
-                border-radius: 50px;
-                font-size: 1.1rem;
-                font-weight: 600;
-                cursor: pointer;
-                color: #ffffff;
-                position: relative;
-                overflow: hidden;
-                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                box-shadow: 
-                    0 0 0 1px rgba(0, 255, 255, 0.3),
-                    0 0 0 2px rgba(138, 43, 226, 0.2),
-                    0 0 0 3px rgba(0, 255, 127, 0.1),
-                    0 4px 20px rgba(0, 255, 255, 0.2),
-                    inset 0 1px 0 rgba(255, 255, 255, 0.2),
-                    inset 0 -1px 0 rgba(255, 255, 255, 0.1);
-                background-clip: padding-box;
-            }
-            
-            .submit-btn::before {
-                content: '';
-                position: absolute;
-                top: 0;
-                left: 0;
-                right: 0;
-                bottom: 0;
-                background: linear-gradient(90deg, 
-                    rgba(0, 255, 255, 0.6) 0%,
-                    rgba(138, 43, 226, 0.6) 25%,
-                    rgba(0, 255, 127, 0.6) 50%,
-                    rgba(0, 191, 255, 0.6) 75%,
-                    rgba(0, 255, 255, 0.6) 100%);
-                background-size: 300% 300%;
-                border-radius: 50px;
-                padding: 2px;
-                mask: linear-gradient(#fff 0 0) content-box, linear-gradient(#fff 0 0);
-                mask-composite: exclude;
-                -webkit-mask: linear-gradient(#fff 0 0) content-box, linear-gradient(#fff 0 0);
-                -webkit-mask-composite: source-out;
-                animation: iridescent-border 3s linear infinite;
-                z-index: -1;
-            }
-            
-            .submit-btn::after {
-                content: '';
-                position: absolute;
-                top: 20%;
-                left: 10%;
-                right: 10%;
-                height: 1px;
-                background: linear-gradient(90deg, 
-                    transparent, 
-                    rgba(255, 255, 255, 0.4), 
-                    transparent);
-                border-radius: 1px;
-                z-index: 1;
-            }
-            
-            @keyframes iridescent-border {
-                0% { background-position: 0% 50%; }
-                50% { background-position: 100% 50%; }
-                100% { background-position: 0% 50%; }
-            }
-            
-            .submit-btn:hover {
-                transform: translateY(-1px) scale(1.02);
-                box-shadow: 
-                    0 0 0 1px rgba(0, 255, 255, 0.5),
-                    0 0 0 2px rgba(138, 43, 226, 0.4),
-                    0 0 0 3px rgba(0, 255, 127, 0.3),
-                    0 6px 30px rgba(0, 255, 255, 0.3),
-                    0 0 40px rgba(138, 43, 226, 0.2),
-                    inset 0 1px 0 rgba(255, 255, 255, 0.3),
-                    inset 0 -1px 0 rgba(255, 255, 255, 0.2);
-            }
-            
-            .submit-btn:active {
-                transform: translateY(0) scale(1);
-            }
-            
-            .reset-btn {
-                background: transparent;
-                border: none;
-                color: #667eea;
-                font-size: 0.9rem;
-                font-weight: 500;
-                cursor: pointer;
-                padding: 0.5rem 1rem;
-                margin-top: 1rem;
-                border-radius: 8px;
-                transition: all 0.3s ease;
-                text-decoration: none;
-                display: inline-block;
-                position: relative;
-                overflow: hidden;
-            }
-            
-            .reset-btn:hover {
-                color: #764ba2;
-                background: rgba(102, 126, 234, 0.1);
-                transform: translateY(-1px);
-            }
-            
-            .reset-btn:active {
-                transform: translateY(0);
-            }
-            
-            .register-link {
-                text-align: center;
-                margin-top: 2rem;
-                padding-top: 1.5rem;
-                border-top: 1px solid rgba(64, 64, 64, 0.5);
-            }
-            
-            .register-link p {
-                color: #9ca3af;
-                font-size: 0.9rem;
-            }
-            
-            .register-link a {
-                color: #667eea;
-                text-decoration: none;
-                font-weight: 500;
-                transition: color 0.3s ease;
-            }
-            
-            .register-link a:hover {
-                color: #764ba2;
-            }
-            
-            /* Mobile responsiveness */
-            @media (max-width: 480px) {
-                .login-container {
-                    margin: 1rem;
-                    padding: 2rem;
-                }
-                
-                .logo h1 {
-                    font-size: 2rem;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="background-pattern"></div>
-        <div class="login-container">
-            <div class="logo">
-                <img src="/static/neurolm-glass-logo.png" alt="NeuroLM" style="max-width: 240px; height: auto;">
-                <p>Sign in to your account</p>
-            </div>
-            <form action="/login" method="post" id="loginForm">
-                <div class="form-group">
-                    <label for="username">Username</label>
-                    <input type="text" id="username" name="username" placeholder="Enter your username" required>
-                </div>
-                <div class="form-group">
-                    <label for="password">Password</label>
-                    <input type="password" id="password" name="password" placeholder="Enter your password" required>
-                </div>
-                
-                <!-- Password reset fields (hidden by default) -->
-                <div id="resetFields" style="display: none;">
-                    <div class="form-group">
-                        <label for="email">Email Address</label>
-                        <input type="email" id="email" name="email" placeholder="Enter your email address">
-                    </div>
-                    <div class="form-group">
-                        <label for="new_password">New Password</label>
-                        <input type="password" id="new_password" name="new_password" placeholder="Enter new password">
-                    </div>
-                    <div class="form-group">
-                        <label for="confirm_password">Confirm New Password</label>
-                        <input type="password" id="confirm_password" name="confirm_password" placeholder="Confirm new password">
-                    </div>
-                </div>
-                
-                <div class="remember-me" id="rememberMe">
-                    <input type="checkbox" id="remember_me" name="remember_me">
-                    <label for="remember_me">Keep me signed in for 30 days</label>
-                </div>
-                
-                <input type="hidden" id="reset_password" name="reset_password" value="false">
-                
-                <button type="submit" class="submit-btn" id="submitBtn">Sign In</button>
-                <button type="button" class="reset-btn" id="resetBtn" onclick="toggleResetMode()">Forgot Password?</button>
-            </form>
-            <div class="register-link">
-                <p>Don't have an account? <a href="/register">Create one here</a></p>
-            </div>
-            
-            <script>
-                function toggleResetMode() {
-                    const resetFields = document.getElementById('resetFields');
-                    const rememberMe = document.getElementById('rememberMe');
-                    const submitBtn = document.getElementById('submitBtn');
-                    const resetBtn = document.getElementById('resetBtn');
-                    const resetPassword = document.getElementById('reset_password');
-                    const passwordField = document.getElementById('password');
-                    
-                    if (resetFields.style.display === 'none') {
-                        // Switch to reset mode
-                        resetFields.style.display = 'block';
-                        rememberMe.style.display = 'none';
-                        submitBtn.textContent = 'Reset Password';
-                        resetBtn.textContent = 'Back to Login';
-                        resetPassword.value = 'true';
-                        passwordField.required = false;
-                        passwordField.style.display = 'none';
-                        passwordField.parentElement.style.display = 'none';
-                        
-                        // Make reset fields required
-                        document.getElementById('email').required = true;
-                        document.getElementById('new_password').required = true;
-                        document.getElementById('confirm_password').required = true;
-                    } else {
-                        // Switch back to login mode
-                        resetFields.style.display = 'none';
-                        rememberMe.style.display = 'block';
-                        submitBtn.textContent = 'Sign In';
-                        resetBtn.textContent = 'Forgot Password?';
-                        resetPassword.value = 'false';
-                        passwordField.required = true;
-                        passwordField.style.display = 'block';
-                        passwordField.parentElement.style.display = 'block';
-                        
-                        // Make reset fields not required
-                        document.getElementById('email').required = false;
-                        document.getElementById('new_password').required = false;
-                        document.getElementById('confirm_password').required = false;
-                    }
-                }
-            </script>
-        </div>
-    </body>
-    </html>
-    """)
+    return FileResponse("login.html")
 
 @app.post("/login")
 async def login_user(
@@ -2427,205 +1897,7 @@ async def reset_password(
 @app.get("/reset-password")
 async def reset_password_page():
     """Serve password reset page"""
-    return HTMLResponse("""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>NeuroLM - Reset Password</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: #000000;
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                position: relative;
-                overflow-y: auto;
-                padding: 1rem 0;
-            }
-            
-            .background-pattern {
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                background-image: url('/static/neural-brain-logo.png');
-                background-size: 40%;
-                background-position: center;
-                background-repeat: no-repeat;
-                opacity: 0.05;
-                filter: blur(1px);
-                z-index: 0;
-            }
-            
-            .reset-container {
-                background: rgba(0, 0, 0, 0.95);
-                backdrop-filter: blur(10px);
-                border: 1px solid rgba(102, 126, 234, 0.3);
-                border-radius: 20px;
-                padding: 2.5rem;
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.4);
-                width: 100%;
-                max-width: 420px;
-                position: relative;
-                z-index: 1;
-            }
-            
-            .logo {
-                text-align: center;
-                margin-bottom: 2rem;
-            }
-            
-            .logo h1 {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 25%, #667eea 50%, #a855f7 75%, #667eea 100%);
-                background-size: 200% 200%;
-                background-clip: text;
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-                font-size: 2rem;
-                font-weight: 700;
-            }
-            
-            .logo p {
-                color: #9ca3af;
-                margin-top: 0.5rem;
-                font-size: 1rem;
-            }
-            
-            .form-group {
-                margin-bottom: 1.5rem;
-            }
-            
-            label {
-                display: block;
-                color: #d1d5db;
-                font-weight: 500;
-                margin-bottom: 0.5rem;
-                font-size: 0.9rem;
-            }
-            
-            input[type="text"], input[type="email"], input[type="password"] {
-                width: 100%;
-                padding: 0.75rem;
-                background: rgba(17, 24, 39, 0.8) !important;
-                border: 1px solid rgba(102, 126, 234, 0.3);
-                border-radius: 10px;
-                color: #f3f4f6 !important;
-                font-size: 1rem;
-                transition: all 0.3s ease;
-            }
-            
-            /* Override browser autocomplete styles */
-            input:-webkit-autofill,
-            input:-webkit-autofill:hover,
-            input:-webkit-autofill:focus,
-            input:-webkit-autofill:active {
-                -webkit-box-shadow: 0 0 0 30px rgba(17, 24, 39, 0.8) inset !important;
-                -webkit-text-fill-color: #f3f4f6 !important;
-            }
-            
-            input[type="text"]:focus, input[type="email"]:focus, input[type="password"]:focus {
-                outline: none;
-                border-color: #667eea;
-                box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-            }
-            
-            .submit-btn {
-                width: 100%;
-                padding: 0.75rem;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                border-radius: 10px;
-                font-size: 1rem;
-                font-weight: 600;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                margin-top: 1rem;
-            }
-            
-            .submit-btn:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 10px 20px rgba(102, 126, 234, 0.3);
-            }
-            
-            .login-link {
-                text-align: center;
-                margin-top: 1.5rem;
-                color: #9ca3af;
-                font-size: 0.9rem;
-            }
-            
-            .login-link a {
-                color: #667eea;
-                text-decoration: none;
-                font-weight: 500;
-            }
-            
-            .login-link a:hover {
-                text-decoration: underline;
-            }
-            
-            .warning {
-                background: rgba(239, 68, 68, 0.1);
-                border: 1px solid rgba(239, 68, 68, 0.3);
-                border-radius: 10px;
-                padding: 1rem;
-                margin-bottom: 1.5rem;
-                color: #fca5a5;
-                font-size: 0.9rem;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="background-pattern"></div>
-        <div class="reset-container">
-            <div class="logo">
-                <h1>NeuroLM</h1>
-                <p>Reset Your Password</p>
-            </div>
-            
-            <div class="warning">
-                <strong>Security Notice:</strong> Please provide your exact username and email address to reset your password. Both must match your account.
-            </div>
-            
-            <form action="/reset-password" method="post">
-                <div class="form-group">
-                    <label for="username">Username</label>
-                    <input type="text" id="username" name="username" placeholder="Enter your username" required>
-                </div>
-                <div class="form-group">
-                    <label for="email">Email Address</label>
-                    <input type="email" id="email" name="email" placeholder="Enter your email" required>
-                </div>
-                <div class="form-group">
-                    <label for="new_password">New Password</label>
-                    <input type="password" id="new_password" name="new_password" placeholder="Enter new password" required>
-                </div>
-                <div class="form-group">
-                    <label for="confirm_password">Confirm New Password</label>
-                    <input type="password" id="confirm_password" name="confirm_password" placeholder="Confirm new password" required>
-                </div>
-                <button type="submit" class="submit-btn">Reset Password</button>
-            </form>
-            
-            <div class="login-link">
-                <p>Remember your password? <a href="/login">Sign in here</a></p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """)
+    return FileResponse("reset-password.html")
 
 # Serve the chat interface as the main page
 @app.get("/")
@@ -2691,6 +1963,155 @@ class MessageListResponse(BaseModel):
     has_more: bool
     oldest_id: Optional[str]
 
+# File context is capped in SQL so large uploads never cross the wire in full
+FILE_CONTEXT_MAX_FILES = 5
+FILE_CONTEXT_MAX_CHARS_PER_FILE = 20000
+
+LLM_ERROR_RESPONSE = "I apologize, but I'm experiencing technical difficulties processing your request right now."
+
+def get_file_context(user_id: str) -> str:
+    """Build the recent-files section of the chat context"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT filename, LEFT(content, %s) FROM user_files WHERE user_id = %s ORDER BY uploaded_at DESC LIMIT %s",
+            (FILE_CONTEXT_MAX_CHARS_PER_FILE, user_id, FILE_CONTEXT_MAX_FILES)
+        )
+        user_files = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        if user_files:
+            return "\n\nAvailable files:\n" + "".join(
+                f"\n--- {filename} ---\n{content}\n" for filename, content in user_files
+            )
+    except Exception as e:
+        print(f"Error fetching user files: {e}")
+    return ""
+
+async def retrieve_memory_context(message: str, user_id: str, conversation_id: Optional[str]) -> str:
+    """Retrieve relevant memories for a chat turn, returning an empty string on failure"""
+    if not intelligent_memory_system:
+        return ""
+    try:
+        context = await intelligent_memory_system.retrieve_memory(
+            query=message,
+            user_id=user_id,
+            conversation_id=conversation_id
+        )
+        print(f"DEBUG: Intelligent memory retrieved: {len(context)} chars")
+        if context:
+            print(f"DEBUG: Memory context preview: {context[:200]}...")
+        return context
+    except Exception as e:
+        print(f"Intelligent memory error (continuing without memory): {e}")
+        return ""
+
+async def build_chat_messages(message: str, user_id: str, conversation_id: Optional[str]) -> tuple:
+    """Gather memory and file context for a chat turn and build the LLM message list"""
+    # Check if user is asking about files and add file content to context
+    file_query_keywords = ["file", "main.py", "analyze", "code", "script", "upload"]
+    message_lower = message.lower()
+    is_file_query = any(keyword in message_lower for keyword in file_query_keywords)
+    
+    # Memory retrieval, file lookup and first name are independent, so fetch them
+    # concurrently; the blocking psycopg2 lookups run in worker threads
+    async def no_file_context() -> str:
+        return ""
+    
+    memory_context, file_context, user_first_name = await asyncio.gather(
+        retrieve_memory_context(message, user_id, conversation_id),
+        asyncio.to_thread(get_file_context, user_id) if is_file_query else no_file_context(),
+        asyncio.to_thread(get_user_first_name, user_id)
+    )
+    context = memory_context + file_context
+    
+    # Static instructions go first so providers can cache the prompt prefix;
+    # only the per-turn memory context changes between requests
+    memory_content = MEMORY_CONTEXT_TEMPLATE.format(
+        user_name=user_first_name or "the user",
+        context=context if context else "No previous conversation history available."
+    )
+    
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT_PREFIX},
+        {"role": "system", "content": memory_content},
+        {"role": "user", "content": message}
+    ]
+    
+    return messages, context
+
+async def prepare_chat_turn(message: str, user_id: str, conversation_id: Optional[str]) -> tuple:
+    """Resolve the conversation for a chat turn and build its LLM message list
+    
+    A new conversation has no recent history to retrieve, so it is created in a
+    worker thread while the memory and file context is gathered.
+    """
+    if conversation_id:
+        messages, context = await build_chat_messages(message, user_id, conversation_id)
+        return conversation_id, messages, context
+    
+    conversation_id, (messages, context) = await asyncio.gather(
+        asyncio.to_thread(create_conversation, user_id),
+        build_chat_messages(message, user_id, None)
+    )
+    return conversation_id, messages, context
+
+async def persist_chat_turn(conversation_id: str, user_id: str, user_message: str,
+                            memory_content: str, response_text: str) -> Tuple[bool, Optional[str]]:
+    """Save a chat turn to the conversation and intelligent memory, returning whether the
+    conversation messages were saved and the assistant memory ID"""
+    user_message_id = None
+    assistant_message_id = None
+    assistant_memory_node_id = None
+    try:
+        # Save both messages in one transaction and get their PostgreSQL message IDs
+        user_message_id, assistant_message_id = await asyncio.to_thread(
+            save_conversation_turn, conversation_id, user_message, response_text
+        )
+        
+        # Now store messages in intelligent memory system with PostgreSQL message IDs
+        if intelligent_memory_system:
+            try:
+                # Embed and store both sides of the turn with a single embedding request
+                memories = []
+                if user_message_id:
+                    memories.append({
+                        'content': memory_content,
+                        'user_id': user_id,
+                        'conversation_id': conversation_id,
+                        'message_type': "user",
+                        'message_id': user_message_id
+                    })
+                if assistant_message_id:
+                    memories.append({
+                        'content': response_text,
+                        'user_id': user_id,
+                        'conversation_id': conversation_id,
+                        'message_type': "assistant",
+                        'message_id': assistant_message_id
+                    })
+                results = await intelligent_memory_system.store_memories(memories)
+                
+                user_memory_id = results[0] if user_message_id else None
+                if user_memory_id:
+                    print(f"DEBUG: Stored user message with PostgreSQL ID {user_message_id}")
+                
+                if assistant_message_id:
+                    assistant_memory_node_id = results[-1]
+                    if assistant_memory_node_id:
+                        print(f"DEBUG: Stored assistant response with PostgreSQL ID {assistant_message_id}")
+                        print(f"DEBUG: Memory {assistant_memory_node_id} queued for background R(t) evaluation")
+                        
+            except Exception as e:
+                print(f"Error storing messages in intelligent memory: {e}")
+                
+    except Exception as e:
+        print(f"Error saving conversation messages: {e}")
+    
+    return assistant_message_id is not None, assistant_memory_node_id
+
 # Chat endpoint
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_memory(chat_request: ChatMessage, request: Request):
@@ -2698,15 +2119,15 @@ async def chat_with_memory(chat_request: ChatMessage, request: Request):
     Chat with LLM using memory system for context
     """
     try:
-        # Extract user_id from session
-        user_data = get_authenticated_user(request)
+        # Extract user_id from session without blocking the event loop
+        user_data = await asyncio.to_thread(get_authenticated_user, request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
         # Check for slash commands
         if chat_request.message.startswith('/'):
-            conversation_id = chat_request.conversation_id or create_conversation(user_id)
+            conversation_id = chat_request.conversation_id or await asyncio.to_thread(create_conversation, user_id)
             if conversation_id:
                 return await handle_slash_command(chat_request.message, user_id, conversation_id)
             else:
@@ -2727,7 +2148,7 @@ async def chat_with_memory(chat_request: ChatMessage, request: Request):
                 message_content = parts[2]  # Extract actual message content after /link [topic]
             elif len(parts) == 2:
                 # Just /link [topic] without message content
-                fallback_conversation_id = chat_request.conversation_id or create_conversation(user_id)
+                fallback_conversation_id = chat_request.conversation_id or await asyncio.to_thread(create_conversation, user_id)
                 return ChatResponse(
                     response=f"Please include your message after `/link {parts[1]}`. Example: `/link cooking I love pasta recipes`",
                     memory_stored=False,
@@ -2735,100 +2156,10 @@ async def chat_with_memory(chat_request: ChatMessage, request: Request):
                     conversation_id=fallback_conversation_id or ""
                 )
         
-        # Handle conversation management first to ensure we have topic context
-        conversation_id = chat_request.conversation_id
-        if not conversation_id:
-            # Create new conversation if none specified
-            conversation_id = create_conversation(user_id)
-        
-        # Get current conversation topic context
-        current_topic = None
-        current_subtopic = None
-        search_scope = "conversation"  # Default for new conversations
-        
-        if conversation_id:
-            # Get conversation details to extract topic context
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT topic, sub_topic FROM conversations WHERE id = %s', (conversation_id,))
-                result = cursor.fetchone()
-                cursor.close()
-                conn.close()
-                
-                if result:
-                    current_topic = result[0]
-                    current_subtopic = result[1]
-                    search_scope = "topic" if current_topic else "conversation"
-            except Exception as e:
-                print(f"Error getting conversation topic: {e}")
-        
-        # Use intelligent memory system for fast, smart retrieval
-        context = ""
-        if intelligent_memory_system:
-            try:
-                context = await intelligent_memory_system.retrieve_memory(
-                    query=chat_request.message,
-                    user_id=user_id,
-                    conversation_id=conversation_id
-                )
-                print(f"DEBUG: Intelligent memory retrieved: {len(context)} chars")
-                if context:
-                    print(f"DEBUG: Memory context preview: {context[:200]}...")
-            except Exception as e:
-                print(f"Intelligent memory error (continuing without memory): {e}")
-                context = ""
-        
-        # Check if user is asking about files and add file content to context
-        file_query_keywords = ["file", "main.py", "analyze", "code", "script", "upload"]
-        is_file_query = any(keyword in chat_request.message.lower() for keyword in file_query_keywords)
-        
-        if is_file_query:
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT filename, content FROM user_files WHERE user_id = %s ORDER BY uploaded_at DESC LIMIT 5",
-                    (user_id,)
-                )
-                user_files = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                
-                if user_files:
-                    context += "\n\nAvailable files:\n"
-                    for filename, content in user_files:
-                        context += f"\n--- {filename} ---\n{content}\n"
-            except Exception as e:
-                print(f"Error fetching user files: {e}")
-        
-        # Get user's first name for personalized responses
-        user_first_name = get_user_first_name(user_id)
-        
-        # User message will be stored in memory after PostgreSQL save to get proper message_id
-        
-        # Generate response using LLM with memory context
-        from model_service import ModelService
-        model_service = ModelService()
-        
-        # Create system message with user context and memories
-        system_content = f"""You are a helpful AI assistant with access to conversation history with {user_first_name or "the user"}.
-
-IMPORTANT: The following are actual previous conversations and messages from your chat history with this user. These are REAL memories, not hypothetical:
-
-{context if context else "No previous conversation history available."}
-
-Instructions:
-- Use the conversation history above to maintain continuity
-- Reference specific details from previous conversations when relevant
-- Be consistent with what you remember from past interactions
-- If the user asks about previous conversations, refer to the actual content above
-- Do not contradict information from your previous responses shown above"""
-
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": chat_request.message}
-        ]
+        # Create new conversation if none specified
+        conversation_id, messages, context = await prepare_chat_turn(
+            chat_request.message, user_id, chat_request.conversation_id
+        )
         
         try:
             response_text = await model_service.chat_completion(
@@ -2839,55 +2170,15 @@ Instructions:
             print(f"DEBUG: Generated response: {response_text[:100]}...")
         except Exception as e:
             print(f"LLM error: {e}")
-            response_text = "I apologize, but I'm experiencing technical difficulties processing your request right now."
-        
-        # Assistant response will be stored in memory after PostgreSQL save to get proper message_id
+            response_text = LLM_ERROR_RESPONSE
         
         # Ensure conversation_id is not None before saving messages
-        user_message_id = None
-        assistant_message_id = None
         assistant_memory_node_id = None
+        turn_saved = False
         if conversation_id:
-            try:
-                # Save user message to conversation and get PostgreSQL message ID
-                user_message_id = save_conversation_message(conversation_id, 'user', chat_request.message)
-                
-                # Save assistant response to conversation and get PostgreSQL message ID
-                assistant_message_id = save_conversation_message(conversation_id, 'assistant', response_text)
-                
-                # Now store messages in intelligent memory system with PostgreSQL message IDs
-                if intelligent_memory_system:
-                    try:
-                        # Store user message with PostgreSQL message ID
-                        if user_message_id:
-                            user_memory_id = await intelligent_memory_system.store_memory(
-                                content=message_content,
-                                user_id=user_id,
-                                conversation_id=conversation_id,
-                                message_type="user",
-                                message_id=user_message_id
-                            )
-                            if user_memory_id:
-                                print(f"DEBUG: Stored user message with PostgreSQL ID {user_message_id}")
-                        
-                        # Store assistant response with PostgreSQL message ID
-                        if assistant_message_id:
-                            assistant_memory_node_id = await intelligent_memory_system.store_memory(
-                                content=response_text,
-                                user_id=user_id,
-                                conversation_id=conversation_id,
-                                message_type="assistant",
-                                message_id=assistant_message_id
-                            )
-                            if assistant_memory_node_id:
-                                print(f"DEBUG: Stored assistant response with PostgreSQL ID {assistant_message_id}")
-                                print(f"DEBUG: Memory {assistant_memory_node_id} queued for background R(t) evaluation")
-                                
-                    except Exception as e:
-                        print(f"Error storing messages in intelligent memory: {e}")
-                        
-            except Exception as e:
-                print(f"Error saving conversation messages: {e}")
+            turn_saved, assistant_memory_node_id = await persist_chat_turn(
+                conversation_id, user_id, chat_request.message, message_content, response_text
+            )
         else:
             print("Warning: Could not create conversation, messages not saved")
         
@@ -2896,12 +2187,75 @@ Instructions:
             memory_stored=True,
             context_used=1 if context else 0,
             conversation_id=conversation_id or "",
-            assistant_message_id=assistant_memory_node_id if assistant_memory_node_id else None
+            assistant_message_id=assistant_memory_node_id if assistant_memory_node_id else None,
+            turn_saved=turn_saved
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+# Streaming chat endpoint
+@app.post("/api/chat/stream")
+async def chat_with_memory_stream(chat_request: ChatMessage, request: Request):
+    """
+    Chat with LLM using memory system for context, streaming the response
+    as newline-delimited JSON events (start, token, done)
+    """
+    user_data = await asyncio.to_thread(get_authenticated_user, request)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user_id = user_data['user_id']
+    
+    # Slash commands (including /link) are handled by the non-streaming endpoint
+    if chat_request.message.startswith('/'):
+        raise HTTPException(status_code=400, detail="Slash commands must be sent to /api/chat")
+    
+    try:
+        conversation_id, messages, context = await prepare_chat_turn(
+            chat_request.message, user_id, chat_request.conversation_id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+    
+    async def event_stream():
+        yield json.dumps({"type": "start", "conversation_id": conversation_id or ""}) + "\n"
+        
+        chunks = []
+        try:
+            async for delta in model_service.chat_completion_stream(
+                messages=messages,
+                model=chat_request.model or "openai/gpt-4o-mini",
+                web_search=chat_request.web_search or False
+            ):
+                chunks.append(delta)
+                yield json.dumps({"type": "token", "content": delta}) + "\n"
+        except Exception as e:
+            print(f"LLM streaming error: {e}")
+            if not chunks:
+                chunks.append(LLM_ERROR_RESPONSE)
+                yield json.dumps({"type": "token", "content": LLM_ERROR_RESPONSE}) + "\n"
+        
+        response_text = "".join(chunks)
+        
+        assistant_memory_node_id = None
+        turn_saved = False
+        if conversation_id:
+            turn_saved, assistant_memory_node_id = await persist_chat_turn(
+                conversation_id, user_id, chat_request.message, chat_request.message, response_text
+            )
+        else:
+            print("Warning: Could not create conversation, messages not saved")
+        
+        yield json.dumps({
+            "type": "done",
+            "conversation_id": conversation_id or "",
+            "assistant_message_id": assistant_memory_node_id,
+            "context_used": 1 if context else 0,
+            "turn_saved": turn_saved
+        }) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 # Conversation management endpoints
 class ConversationListResponse(BaseModel):
     conversations: List[ConversationResponse]
@@ -3007,19 +2361,22 @@ async def get_user_name_endpoint(request: Request):
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
-        first_name = get_user_first_name(user_id)
-        
-        # Get user feedback score
+        # Get first name and feedback score in one round-trip
+        first_name = None
         conn = None
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
-            cursor.execute("SELECT feedback_score FROM users WHERE id = %s", (user_id,))
+            cursor.execute("SELECT first_name, feedback_score FROM users WHERE id = %s", (user_id,))
             result = cursor.fetchone()
-            feedback_score = result[0] if result else 0
+            first_name = result[0] if result else None
+            feedback_score = result[1] if result else 0
             cursor.close()
+            if first_name:
+                cache_user_first_name(user_id, first_name)
         except Exception as e:
             print(f"ERROR: Failed to get user feedback score: {e}")
+            first_name = get_user_first_name(user_id)
             feedback_score = 0
         finally:
             if conn:
@@ -3071,13 +2428,14 @@ async def create_subtopic_endpoint(request: Request, topic: str, subtopic_data:
         if not subtopic_data.name or not subtopic_data.name.strip():
             raise HTTPException(status_code=400, detail="Sub-topic name cannot be empty")
         
-        # Check if topic exists
+        # Check if topic exists; the same listing carries its distinct sub-topics, so
+        # the limit check below needs no second query
         topics = get_all_topics(user_id)
         if topic.lower() not in topics:
             raise HTTPException(status_code=404, detail="Topic not found")
         
         # Check sub-topic limit
-        if get_sub_topic_count(user_id, topic) >= 5:
+        if len(topics[topic.lower()]) >= 5:
             raise HTTPException(status_code=400, detail="Maximum 5 sub-topics allowed per topic")
         
         success = create_subtopic_entry(user_id, topic, subtopic_data.name)
@@ -3104,10 +2462,7 @@ async def update_conversation_topic_endpoint(conversation_id: str, request: Requ
         user_id = user_data['user_id']
         
         # Verify the conversation belongs to the user
-        conversations = get_user_conversations(user_id, limit=1000, offset=0, topic=None, sub_topic=None)  # Get all conversations to check ownership
-        conversation_exists = any(conv['id'] == conversation_id for conv in conversations['conversations'])
-        
-        if not conversation_exists:
+        if not user_owns_conversation(user_id, conversation_id):
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Update the conversation topic
@@ -3132,10 +2487,7 @@ async def delete_conversation(conversation_id: str, request: Request):
         user_id = user_data['user_id']
         
         # Verify the conversation belongs to the user
-        conversations = get_user_conversations(user_id, limit=1000, offset=0, topic=None, sub_topic=None)
-        conversation_exists = any(conv['id'] == conversation_id for conv in conversations['conversations'])
-        
-        if not conversation_exists:
+        if not user_owns_conversation(user_id, conversation_id):
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Delete from PostgreSQL memory system and conversations
@@ -3301,12 +2653,8 @@ async def get_user_files(request: Request, search: Optional[str] = None):
 async def get_available_models():
     """Get all available models from OpenRouter"""
     try:
-        from model_service import ModelService
-        model_service = ModelService()
-        models = model_service.get_models()
-        # Sort alphabetically by name
-        models.sort(key=lambda x: x.get('name', '').lower())
-        return models
+        # Already sorted by name; a refresh is a blocking request, so run it in a thread
+        return await asyncio.to_thread(model_service.get_models)
     except Exception as e:
         # Return basic models if OpenRouter is unavailable
         default_models = [
@@ -3411,11 +2759,7 @@ async def submit_feedback(feedback_request: FeedbackRequest, request: Request):
         )
         
         if success:
-            # Calculate final quality score using f(R(t), H(t))
-            await intelligent_memory_system.update_final_quality_score(
-                memory_id=feedback_request.message_id,
-                user_id=user_id
-            )
+            # The final quality score f(R(t), H(t)) was updated with the feedback
             
             # Increment user feedback score by 1 (only if not already awarded for this message)
             try:
@@ -3569,4 +2913,7 @@ async def debug_auth_test():
         return {"database_connected": False, "error": str(e)}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=5000)
+    if len(sys.argv) > 1 and sys.argv[1] == "init-db":
+        init_file_storage()
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -3,26 +3,39 @@ Model Service for OpenRouter integration
 """
 import requests
 import os
-from typing import List, Dict, Optional
+import json
+import time
+from typing import List, Dict, Optional, AsyncIterator
 import asyncio
 import httpx
 
+# Seconds before the OpenRouter model list is fetched again; it changes rarely
+MODELS_CACHE_TTL = int(os.getenv("MODELS_CACHE_TTL", "3600"))
+
+def sort_models(models: List[Dict]) -> List[Dict]:
+    """Order models alphabetically by name for display"""
+    return sorted(models, key=lambda model: model.get("name", "").lower())
+
 class ModelService:
     """Service for managing OpenRouter AI models and chat completions"""
     
     def __init__(self):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.base_url = "https://openrouter.ai/api/v1"
+        # Fetched models are cached sorted by name, with an ID index for lookups
         self._models_cache = None
-        self.default_models = [
+        self._models_cached_at = 0.0
+        self._models_by_id: Dict[str, Dict] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.default_models = sort_models([
             {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini", "description": "Fast and efficient model for general chat"},
             {"id": "google/gemini-2.0-flash-001", "name": "Gemini 2.0 Flash", "description": "Google's latest fast model"},
             {"id": "google/gemini-2.5-flash-lite-preview-06-17", "name": "Gemini 2.5 Flash Lite", "description": "1M+ context window"}
-        ]
+        ])
     
     def get_models(self) -> List[Dict]:
-        """Get available models from OpenRouter"""
-        if self._models_cache:
+        """Get available models from OpenRouter, sorted by name"""
+        if self._models_cache and time.monotonic() - self._models_cached_at < MODELS_CACHE_TTL:
             return self._models_cache
         
         try:
@@ -47,18 +60,37 @@ class ModelService:
                         "description": model.get("description", "")
                     })
                 
-                self._models_cache = models
-                return models
+                self._models_cache = sort_models(models)
+                self._models_cached_at = time.monotonic()
+                self._models_by_id = {model["id"]: model for model in self._models_cache}
+                return self._models_cache
             else:
-                return self.default_models
+                # Keep serving an expired list rather than falling back to the defaults
+                return self._models_cache or self.default_models
                 
         except Exception as e:
             print(f"Error fetching models: {e}")
-            return self.default_models
+            return self._models_cache or self.default_models
     
-    async def chat_completion(self, messages: List[Dict], model: str = "openai/gpt-4o-mini", web_search: bool = False) -> str:
-        """Generate chat completion using OpenRouter API"""
-        
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared pooled client so chat turns reuse warm keep-alive connections"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            )
+        return self._http_client
+    
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+    
+    def _build_chat_request(self, messages: List[Dict], model: str, web_search: bool, stream: bool = False,
+                            max_tokens: Optional[int] = None, response_format: Optional[Dict] = None) -> tuple:
+        """Build headers and payload for an OpenRouter chat completion request"""
         if not self.api_key:
             raise Exception("OpenRouter API key is required for chat completions")
         
@@ -75,30 +107,85 @@ class ModelService:
             "temperature": 0.7
         }
         
+        if stream:
+            payload["stream"] = True
+        
+        # Cap and constrain the output for callers that only need a short structured reply
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if response_format is not None:
+            payload["response_format"] = response_format
+        
         # Add web search functionality if enabled
         if web_search:
             # Use the :online shortcut for web search
             if not payload["model"].endswith(":online"):
                 payload["model"] = f"{model}:online"
         
+        return headers, payload
+    
+    async def chat_completion(self, messages: List[Dict], model: str = "openai/gpt-4o-mini", web_search: bool = False,
+                              max_tokens: Optional[int] = None, response_format: Optional[Dict] = None) -> str:
+        """Generate chat completion using OpenRouter API"""
+        headers, payload = self._build_chat_request(messages, model, web_search,
+                                                    max_tokens=max_tokens, response_format=response_format)
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            response = await self.http_client.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data["choices"][0]["message"]["content"]
+            else:
+                raise Exception(f"API error: {response.status_code} - {response.text}")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    raise Exception(f"API error: {response.status_code} - {response.text}")
-                    
         except Exception as e:
             raise Exception(f"Chat completion failed: {str(e)}")
     
+    async def chat_completion_stream(self, messages: List[Dict], model: str = "openai/gpt-4o-mini", web_search: bool = False) -> AsyncIterator[str]:
+        """Stream chat completion content deltas from OpenRouter as they arrive"""
+        headers, payload = self._build_chat_request(messages, model, web_search, stream=True)
+        
+        try:
+            async with self.http_client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=60.0
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise Exception(f"API error: {response.status_code} - {body.decode(errors='replace')}")
+                
+                async for line in response.aiter_lines():
+                    # Skip SSE comments such as ": OPENROUTER PROCESSING" keep-alives
+                    if not line.startswith("data: "):
+                        continue
+                    
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+                    
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    
+                    choices = chunk.get("choices") or []
+                    if choices:
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            yield content
+                
+        except Exception as e:
+            raise Exception(f"Chat completion stream failed: {str(e)}")
+    
     def search_models(self, query: str) -> List[Dict]:
         """Search models by name or description"""
         models = self.get_models()
@@ -115,7 +202,19 @@ class ModelService:
     def get_model_by_id(self, model_id: str) -> Optional[Dict]:
         """Get model details by ID"""
         models = self.get_models()
+        if models is self._models_cache:
+            return self._models_by_id.get(model_id)
         for model in models:
             if model.get("id") == model_id:
                 return model
-        return None
\ No newline at end of file
+        return None
+
+# Process-wide instance so every caller shares one models cache and HTTP connection pool
+_model_service: Optional[ModelService] = None
+
+def get_model_service() -> ModelService:
+    """Return the shared ModelService, creating it on first use"""
+    global _model_service
+    if _model_service is None:
+        _model_service = ModelService()
+    return _model_service
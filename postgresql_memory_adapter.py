@@ -6,14 +6,263 @@ PostgreSQL + pgvector for intelligent memory storage
 import os
 import asyncio
 import asyncpg
+import base64
 import json
 import hashlib
 import re
-from typing import List, Dict, Optional, Union
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Union
 from enum import Enum
 from datetime import datetime, timedelta
 import numpy as np
-from openai import OpenAI
+from pgvector.asyncpg import register_vector
+from openai import AsyncOpenAI
+from model_service import get_model_service
+
+# Fallback context when no semantic match: recent messages from this conversation
+RECENT_CONTEXT_WINDOW = timedelta(hours=1)
+RECENT_CONTEXT_LIMIT = 5
+
+# Shared sentinel for failed embeddings: falsy, immutable and never allocated per failure.
+# Failures are skipped rather than stored as zero vectors, which have no cosine distance
+EMPTY_EMBEDDING: tuple = ()
+
+# In-process LRU of recent embeddings; repeated queries and re-stored text skip the API.
+# Misses fall through to the shared embedding_cache table before calling OpenAI
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+
+# OpenAI accepts up to 2048 inputs and ~300k tokens per embeddings request. Requests
+# are filled up to both limits, estimating 4 characters per token with headroom
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "2048"))
+EMBEDDING_BATCH_MAX_CHARS = int(os.getenv("EMBEDDING_BATCH_MAX_CHARS", "800000"))
+# Each input is also limited to 8191 tokens, and one over-long input fails the whole
+# request. Inputs are truncated to this many characters, ~3 per token so dense text
+# such as code stays under the limit
+EMBEDDING_INPUT_MAX_CHARS = int(os.getenv("EMBEDDING_INPUT_MAX_CHARS", "24000"))
+
+# Embedding requests allowed in flight at once; bounds bulk stores under the API rate limit
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "6"))
+
+# Semantic cache for retrieve_memory: a query whose embedding is this close (cosine)
+# to a recent query in the same conversation reuses its memory context
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_ENTRIES_PER_SCOPE = int(os.getenv("SEMANTIC_CACHE_ENTRIES_PER_SCOPE", "64"))
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "256"))
+SEMANTIC_CACHE_TTL = timedelta(seconds=int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "300")))
+
+# Response evaluation (R(t)) model, and an LRU of scores so re-evaluating the same
+# query/response pair skips the OpenRouter call
+EVALUATION_MODEL = "mistralai/mistral-small-3.2-24b-instruct"
+EVALUATION_CACHE_SIZE = int(os.getenv("EVALUATION_CACHE_SIZE", "4096"))
+# First 0-1 number in the evaluator's reply, tolerating text such as "Score: 0.8"
+EVALUATION_SCORE_RE = re.compile(r"[01](?:\.\d+)?|\.\d+")
+# JSON array in a batched evaluator reply, tolerating prose or code fences around it
+EVALUATION_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+EVALUATION_SYSTEM_PROMPT = "You are an AI response evaluator. Rate the quality of AI responses on a scale of 0.0 to 1.0 based on accuracy, helpfulness, and relevance."
+# Unscored memories rated per background pass, all in one evaluator request
+EVALUATION_BATCH_SIZE = int(os.getenv("EVALUATION_BATCH_SIZE", "10"))
+# Output token budget for a single score, and per score in a batched reply
+EVALUATION_MAX_TOKENS = 16
+EVALUATION_BATCH_TOKENS_PER_SCORE = 8
+# Per-pair evaluator requests allowed in flight when a batched reply can't be parsed
+EVALUATION_CONCURRENCY = max(1, int(os.getenv("EVALUATION_CONCURRENCY", "8")))
+
+# Connection pool tunables; keep a warm connection so chat turns skip the connect handshake
+POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("PG_POOL_MAX_INACTIVE_LIFETIME", "300"))
+POOL_COMMAND_TIMEOUT = float(os.getenv("PG_POOL_COMMAND_TIMEOUT", "60"))
+
+# Hot-path statements are kept as constants so every call sends identical text and
+# asyncpg's per-connection statement cache reuses the prepared, planned statement
+STORE_MEMORY_SQL = """
+    INSERT INTO intelligent_memories 
+    (id, user_id, conversation_id, message_id, content, message_type, embedding, importance)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+
+# Batches at least this large are written with the COPY protocol instead of INSERTs
+STORE_MEMORY_COPY_THRESHOLD = int(os.getenv("STORE_MEMORY_COPY_THRESHOLD", "50"))
+STORE_MEMORY_COLUMNS = ['id', 'user_id', 'conversation_id', 'message_id', 'content',
+                        'message_type', 'embedding', 'importance']
+
+# Similarity search takes the nearest candidates straight from the HNSW index, then
+# re-ranks only those by quality-boosted score. The index covers every user's rows
+# and the user_id filter is applied to what the index returns, so a plain scan would
+# yield only this user's share of the ef_search nearest rows in the whole table, often
+# none. Iterative scans (pgvector >= 0.8.0) keep walking the graph until the filter
+# has produced enough candidates, up to HNSW_MAX_SCAN_TUPLES visited rows; past that
+# bound recall for users with few rows depends on these settings. hnsw.ef_search
+# must be at least the candidate count or a scan returns fewer rows than asked for
+SEARCH_CANDIDATE_LIMIT = int(os.getenv("MEMORY_SEARCH_CANDIDATES", "50"))
+HNSW_EF_SEARCH = max(100, SEARCH_CANDIDATE_LIMIT)
+HNSW_MAX_SCAN_TUPLES = int(os.getenv("HNSW_MAX_SCAN_TUPLES", "20000"))
+
+# Stored and query embeddings are unit length (see to_vector), so the negative inner
+# product <#> ranks exactly like cosine distance without its per-pair norms; the
+# cosine distance is 1 + that value. It uses the half-precision expression the HNSW
+# index is built on and is computed once per candidate. Recent messages from the
+# conversation are returned in the same round-trip when nothing is similar enough;
+# semantic rows have a NULL message_type so the caller can tell the two apart
+SEARCH_MEMORIES_SQL = """
+    WITH semantic AS (
+        SELECT content,
+               ROW_NUMBER() OVER (
+                   ORDER BY CASE 
+                                WHEN final_quality_score IS NOT NULL 
+                                THEN final_quality_score * 0.2 - negative_similarity * 0.8
+                                ELSE -negative_similarity
+                            END DESC
+               ) AS rank
+        FROM (
+            SELECT content, final_quality_score,
+                   embedding::halfvec(1536) <#> $1::vector::halfvec(1536) AS negative_similarity
+            FROM intelligent_memories 
+            WHERE user_id = $2
+            ORDER BY negative_similarity
+            LIMIT $4
+        ) candidates
+        WHERE 1 + negative_similarity < 0.7
+        ORDER BY rank
+        LIMIT $3
+    ),
+    recent AS (
+        SELECT content, message_type,
+               ROW_NUMBER() OVER (ORDER BY created_at DESC) AS rank
+        FROM intelligent_memories
+        WHERE user_id = $2
+        AND conversation_id = $5
+        AND created_at > NOW() - $6::interval
+        AND NOT EXISTS (SELECT 1 FROM semantic)
+        ORDER BY created_at DESC
+        LIMIT $7
+    )
+    SELECT content, NULL::varchar AS message_type, rank FROM semantic
+    UNION ALL
+    SELECT content, message_type, rank FROM recent
+    ORDER BY rank
+"""
+
+def truncate_embedding_input(text: str) -> str:
+    """Cut text to the per-input budget so the embeddings API accepts it"""
+    return text[:EMBEDDING_INPUT_MAX_CHARS]
+
+def chunk_embedding_inputs(texts: List[str]) -> List[List[str]]:
+    """Split texts into request-sized chunks by input count and estimated tokens
+    
+    Sizes are counted after truncate_embedding_input, which _request_embeddings applies.
+    """
+    chunks = []
+    chunk = []
+    chunk_chars = 0
+    for text in texts:
+        text_chars = min(len(text), EMBEDDING_INPUT_MAX_CHARS)
+        if chunk and (len(chunk) >= EMBEDDING_BATCH_SIZE or chunk_chars + text_chars > EMBEDDING_BATCH_MAX_CHARS):
+            chunks.append(chunk)
+            chunk = []
+            chunk_chars = 0
+        chunk.append(text)
+        chunk_chars += text_chars
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def normalize_embedding_text(text: str) -> str:
+    """Normalize text for embedding cache keys so trivial variants share an entry"""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def to_vector(embedding: List[float]) -> np.ndarray:
+    """Convert an embedding for the binary pgvector codec registered on the pool
+    
+    pgvector stores float32, so the codec sends 4 bytes per dimension instead of a
+    ~20KB text literal that the server has to parse back into a vector. Vectors are
+    scaled to unit length so similarity search can use the inner product.
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.sqrt(np.dot(vector, vector))
+    return vector / norm if norm else vector
+
+class SemanticCache:
+    """Recent query embeddings and their memory context, searched by cosine similarity
+    
+    Entries are scoped per (user, conversation) and kept as an int8 matrix of unit
+    vectors with one float32 scale per row, a quarter of the memory of float32 at a
+    full cache; a lookup upcasts it for a single float32 matrix-vector product and
+    rescales the result. Scopes are evicted LRU and invalidated when the user
+    stores new memories.
+    """
+    
+    def __init__(self):
+        self._scopes: "OrderedDict[tuple, dict]" = OrderedDict()
+    
+    @staticmethod
+    def _unit_vector(embedding: List[float]) -> Optional[np.ndarray]:
+        """Normalize an embedding so dot products are cosine similarities"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        # sqrt of a dot product skips linalg.norm's norm-type dispatch
+        norm = np.sqrt(np.dot(vector, vector))
+        return vector / norm if norm else None
+    
+    @staticmethod
+    def _quantize(vector: np.ndarray) -> Tuple[np.ndarray, np.float32]:
+        """Quantize a vector to int8 with a per-vector scale back to its original range"""
+        scale = np.float32(np.max(np.abs(vector)) / 127)
+        return np.round(vector / scale).astype(np.int8), scale
+    
+    def get(self, scope: tuple, embedding: List[float]) -> Optional[str]:
+        """Return cached context for the closest recent query above the threshold"""
+        entry = self._scopes.get(scope)
+        vector = self._unit_vector(embedding)
+        if entry is None or vector is None:
+            return None
+        
+        # Drop expired rows; they are appended in time order so expiry is a prefix
+        cutoff = datetime.now() - SEMANTIC_CACHE_TTL
+        expired = 0
+        while expired < len(entry['created']) and entry['created'][expired] < cutoff:
+            expired += 1
+        if expired:
+            entry['vectors'] = entry['vectors'][expired:]
+            entry['scales'] = entry['scales'][expired:]
+            del entry['results'][:expired]
+            del entry['created'][:expired]
+        if not entry['results']:
+            del self._scopes[scope]
+            return None
+        
+        self._scopes.move_to_end(scope)
+        similarities = (entry['vectors'].astype(np.float32) @ vector) * entry['scales']
+        best = int(np.argmax(similarities))
+        if similarities[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return entry['results'][best]
+        return None
+    
+    def put(self, scope: tuple, embedding: List[float], result: str):
+        """Remember the memory context returned for a query embedding"""
+        vector = self._unit_vector(embedding)
+        if vector is None or SEMANTIC_CACHE_ENTRIES_PER_SCOPE <= 0:
+            return
+        entry = self._scopes.get(scope)
+        if entry is None:
+            entry = {'vectors': np.empty((0, vector.shape[0]), dtype=np.int8),
+                     'scales': np.empty(0, dtype=np.float32), 'results': [], 'created': []}
+            self._scopes[scope] = entry
+        self._scopes.move_to_end(scope)
+        
+        quantized, scale = self._quantize(vector)
+        entry['vectors'] = np.vstack([entry['vectors'], quantized])[-SEMANTIC_CACHE_ENTRIES_PER_SCOPE:]
+        entry['scales'] = np.append(entry['scales'], scale)[-SEMANTIC_CACHE_ENTRIES_PER_SCOPE:]
+        entry['results'] = (entry['results'] + [result])[-SEMANTIC_CACHE_ENTRIES_PER_SCOPE:]
+        entry['created'] = (entry['created'] + [datetime.now()])[-SEMANTIC_CACHE_ENTRIES_PER_SCOPE:]
+        while len(self._scopes) > SEMANTIC_CACHE_MAX_SCOPES:
+            self._scopes.popitem(last=False)
+    
+    def invalidate_user(self, user_id: str):
+        """Forget every cached context for a user whose memories changed"""
+        for scope in [scope for scope in self._scopes if scope[0] == user_id]:
+            del self._scopes[scope]
 
 class MemoryIntent(Enum):
     """Classification of user query intent for memory routing"""
@@ -30,22 +279,33 @@ class MemoryRouter:
         self.personal_keywords = ['my', 'me', 'i', 'myself', 'mine', 'personal']
         self.factual_keywords = ['what', 'when', 'where', 'who', 'how', 'tell me about']
         self.general_keywords = ['explain', 'define', 'what is', 'help me understand']
+        self.recall_keywords = ['remember', 'recall', 'told you', 'mentioned']
+        
+        # One case-insensitive scan per keyword group instead of a substring test per keyword
+        self.personal_re = self._compile_keywords(self.personal_keywords)
+        self.factual_re = self._compile_keywords(self.factual_keywords)
+        self.general_re = self._compile_keywords(self.general_keywords)
+        # Recall words keep prefix matching so "remembered" and "recalling" still count
+        self.recall_re = re.compile(r"\b(?:" + "|".join(map(re.escape, self.recall_keywords)) + ")", re.IGNORECASE)
+    
+    @staticmethod
+    def _compile_keywords(keywords: List[str]) -> re.Pattern:
+        """Compile keywords into a single whole-word, case-insensitive alternation"""
+        return re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b", re.IGNORECASE)
         
     def classify_intent(self, text: str) -> MemoryIntent:
         """Classify user intent for memory routing"""
-        text_lower = text.lower()
-        
         # Check for personal recall
-        if any(keyword in text_lower for keyword in self.personal_keywords):
-            if any(recall in text_lower for recall in ['remember', 'recall', 'told you', 'mentioned']):
+        if self.personal_re.search(text):
+            if self.recall_re.search(text):
                 return MemoryIntent.RECALL_PERSONAL
         
         # Check for factual recall
-        if any(keyword in text_lower for keyword in self.factual_keywords):
+        if self.factual_re.search(text):
             return MemoryIntent.RECALL_FACTUAL
         
         # Check for general knowledge
-        if any(keyword in text_lower for keyword in self.general_keywords):
+        if self.general_re.search(text):
             return MemoryIntent.GENERAL_KNOWLEDGE
         
         # Default to contextual
@@ -58,29 +318,43 @@ class MemoryRouter:
 class ImportanceScorer:
     """Score the importance of content for memory storage"""
     
+    # Indicator phrases and the score each group adds at most once
+    INDICATOR_GROUPS = [
+        (['my name', 'i work', 'i live', 'my email', 'my phone'], 0.3),  # Personal information
+        (['def ', 'class ', 'import ', 'function'], 0.2),  # Code or technical content
+    ]
+    
+    def __init__(self):
+        # One case-insensitive pass finds every indicator instead of a scan per phrase
+        self.indicator_group = {}
+        for group, (indicators, _) in enumerate(self.INDICATOR_GROUPS):
+            for indicator in indicators:
+                self.indicator_group[indicator] = group
+        self.indicator_re = re.compile(
+            "|".join(map(re.escape, self.indicator_group)), re.IGNORECASE
+        )
+    
     def score_importance(self, content: str, context: str = "") -> float:
         """Multi-factor importance scoring"""
         score = 0.5  # Base score
+        content_length = len(content)
         
         # Length factor
-        if len(content) > 100:
+        if content_length > 100:
             score += 0.1
-        if len(content) > 500:
+        if content_length > 500:
             score += 0.1
         
-        # Personal information indicators
-        personal_indicators = ['my name', 'i work', 'i live', 'my email', 'my phone']
-        if any(indicator in content.lower() for indicator in personal_indicators):
-            score += 0.3
+        # Personal information and technical content indicators
+        matched_groups = {self.indicator_group[match.group().lower()]
+                          for match in self.indicator_re.finditer(content)}
+        for group in matched_groups:
+            score += self.INDICATOR_GROUPS[group][1]
         
         # Question indicators
         if content.endswith('?'):
             score += 0.1
         
-        # Code or technical content
-        if any(keyword in content.lower() for keyword in ['def ', 'class ', 'import ', 'function']):
-            score += 0.2
-        
         return min(1.0, score)
 
 class PostgreSQLMemorySystem:
@@ -88,72 +362,255 @@ class PostgreSQLMemorySystem:
     
     def __init__(self):
         self.database_url = os.getenv("DATABASE_URL")
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.router = MemoryRouter()
         self.importance_scorer = ImportanceScorer()
         self.pool = None
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._embedding_semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+        self._semantic_cache = SemanticCache()
+        self._evaluation_cache: "OrderedDict[str, float]" = OrderedDict()
+        # Fire-and-forget writes; references are held until each task finishes
+        self._background_tasks: "set[asyncio.Task]" = set()
         
     async def initialize_pool(self):
         """Initialize the PostgreSQL connection pool"""
         if not self.pool:
             self.pool = await asyncpg.create_pool(
                 self.database_url,
-                min_size=1,
-                max_size=10,
-                command_timeout=60
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=POOL_MAX_INACTIVE_LIFETIME,
+                command_timeout=POOL_COMMAND_TIMEOUT,
+                init=register_vector
             )
     
     async def close_pool(self):
         """Close the PostgreSQL connection pool"""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
         if self.pool:
             await self.pool.close()
             self.pool = None
     
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embeddings using OpenAI API"""
+    @staticmethod
+    def _embedding_cache_key(text: str) -> str:
+        """Cache key for an embedding, hashed so long texts aren't held as keys"""
+        return hashlib.sha1(normalize_embedding_text(text).encode()).hexdigest()
+    
+    async def _get_persisted_embeddings(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch embeddings from the shared embedding_cache table by cache key"""
+        if not keys:
+            return {}
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
+            await self.initialize_pool()
+            
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch("""
+                    SELECT text_hash, embedding FROM embedding_cache
+                    WHERE model = $1 AND text_hash = ANY($2::text[])
+                """, EMBEDDING_MODEL, keys)
+            
+            # Vectors are stored as raw float32 bytes: 6KB each instead of ~25KB of JSON
+            return {row['text_hash']: np.frombuffer(row['embedding'], dtype=np.float32).tolist()
+                    for row in rows}
+                
+        except Exception as e:
+            print(f"Error reading embedding cache: {e}")
+            return {}
+    
+    async def _persist_embeddings(self, embeddings: Dict[str, List[float]]):
+        """Write new embeddings to the shared embedding_cache table in one statement"""
+        keys = [key for key, embedding in embeddings.items() if embedding]
+        if not keys:
+            return
+        vectors = [np.asarray(embeddings[key], dtype=np.float32).tobytes() for key in keys]
+        try:
+            await self.initialize_pool()
+            
+            async with self.pool.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO embedding_cache (text_hash, model, embedding)
+                    SELECT t.text_hash, $3, t.embedding
+                    FROM unnest($1::text[], $2::bytea[]) AS t(text_hash, embedding)
+                    ON CONFLICT (text_hash, model) DO NOTHING
+                """, keys, vectors, EMBEDDING_MODEL)
+                
+        except Exception as e:
+            print(f"Error writing embedding cache: {e}")
+    
+    def _get_cached_embedding(self, text: str) -> Optional[List[float]]:
+        """Return a cached embedding and mark it recently used"""
+        key = self._embedding_cache_key(text)
+        embedding = self._embedding_cache.get(key)
+        if embedding is not None:
+            self._embedding_cache.move_to_end(key)
+        return embedding
+    
+    def _cache_embedding(self, text: str, embedding: List[float]):
+        """Add an embedding to the LRU cache, evicting the oldest entry when full"""
+        if not embedding or EMBEDDING_CACHE_SIZE <= 0:
+            return
+        key = self._embedding_cache_key(text)
+        self._embedding_cache[key] = embedding
+        self._embedding_cache.move_to_end(key)
+        while len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+            self._embedding_cache.popitem(last=False)
+    
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts with one OpenAI request, in input order
+        
+        Vectors come back base64-encoded float32, about a quarter of the JSON float
+        text, and are decoded with numpy rather than parsed number by number.
+        """
+        async with self._embedding_semaphore:
+            response = await self.openai_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=[truncate_embedding_input(text) for text in texts],
+                encoding_format="base64"
             )
-            return response.data[0].embedding
+        # Results carry their input index; place each at it so vectors line up with
+        # texts in one pass rather than sorting the response
+        embeddings: List[List[float]] = [EMPTY_EMBEDDING] * len(texts)
+        for item in response.data:
+            embeddings[item.index] = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32).tolist()
+        return embeddings
+    
+    async def generate_embedding(self, text: str) -> List[float]:
+        """Generate embeddings using OpenAI API"""
+        return (await self.generate_embeddings_batch([text]))[0]
+    
+    async def _embed_chunk(self, chunk: List[str]) -> List[List[float]]:
+        """Embed one request-sized chunk, retrying item by item if the request fails"""
+        try:
+            return await self._request_embeddings(chunk)
         except Exception as e:
-            print(f"Error generating embedding: {e}")
+            print(f"Error generating batch embeddings, retrying individually: {e}")
+        
+        async def embed_one(text: str) -> List[float]:
+            try:
+                return (await self._request_embeddings([text]))[0]
+            except Exception as e:
+                print(f"Error generating embedding: {e}")
+                return EMPTY_EMBEDDING
+        
+        return await asyncio.gather(*[embed_one(text) for text in chunk])
+    
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts using as few OpenAI requests as possible"""
+        if not texts:
             return []
+        
+        # Embed each distinct uncached text once and scatter the vectors back to every position
+        embedding_by_text = {}
+        for text in dict.fromkeys(texts):
+            cached = self._get_cached_embedding(text)
+            if cached is not None:
+                embedding_by_text[text] = cached
+        missing_texts = [text for text in dict.fromkeys(texts) if text not in embedding_by_text]
+        
+        # Second tier: embeddings persisted by any instance, shared across restarts
+        if missing_texts:
+            keys = {text: self._embedding_cache_key(text) for text in missing_texts}
+            persisted = await self._get_persisted_embeddings(list(set(keys.values())))
+            for text in missing_texts:
+                embedding = persisted.get(keys[text])
+                if embedding is not None:
+                    self._cache_embedding(text, embedding)
+                    embedding_by_text[text] = embedding
+            missing_texts = [text for text in missing_texts if text not in embedding_by_text]
+        
+        # Chunks run concurrently; the semaphore in _request_embeddings bounds requests in flight
+        chunks = chunk_embedding_inputs(missing_texts)
+        chunk_results = await asyncio.gather(*[self._embed_chunk(chunk) for chunk in chunks])
+        new_embeddings = {}
+        for chunk, chunk_embeddings in zip(chunks, chunk_results):
+            for text, embedding in zip(chunk, chunk_embeddings):
+                self._cache_embedding(text, embedding)
+                embedding_by_text[text] = embedding
+                new_embeddings[self._embedding_cache_key(text)] = embedding
+        if new_embeddings:
+            # Filling the shared cache shouldn't delay the caller, so write in the background
+            task = asyncio.create_task(self._persist_embeddings(new_embeddings))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        
+        return [embedding_by_text[text] for text in texts]
     
-    async def store_memory(self, content: str, user_id: str, conversation_id: Optional[str], 
-                          message_type: str = "user", message_id: Optional[int] = None) -> Optional[str]:
-        """Store memory with intelligent importance scoring"""
+    async def store_memories(self, memories: List[Dict]) -> List[Optional[str]]:
+        """Store several memories with batched embedding requests and a single insert
+        
+        Each entry takes the store_memory arguments as keys: content, user_id,
+        conversation_id, message_type and message_id. Returns IDs in input order.
+        """
+        results: List[Optional[str]] = [None] * len(memories)
+        if not memories:
+            return results
+        
         try:
-            # Generate embedding
-            embedding = self.generate_embedding(content)
-            if not embedding:
-                return None
+            # Score importance first so low-value content never reaches the embedding API
+            pending = []
+            for index, memory in enumerate(memories):
+                importance = self.importance_scorer.score_importance(memory['content'])
+                if importance >= 0.3:
+                    pending.append((index, memory, importance))
+            if not pending:
+                return results
             
-            # Score importance
-            importance = self.importance_scorer.score_importance(content)
+            embeddings = await self.generate_embeddings_batch(
+                [memory['content'] for _, memory, _ in pending]
+            )
             
-            # Skip storing if importance is too low
-            if importance < 0.3:
-                return None
+            # IDs are generated client-side so the batch is written without RETURNING;
+            # created_at is left to the column default so it uses the database clock
+            rows = []
+            for (index, memory, importance), embedding in zip(pending, embeddings):
+                if not embedding:
+                    continue
+                memory_id = uuid.uuid4()
+                rows.append((
+                    memory_id, memory['user_id'], memory.get('conversation_id'), memory.get('message_id'),
+                    memory['content'], memory.get('message_type', 'user'), to_vector(embedding),
+                    importance
+                ))
+                results[index] = str(memory_id)
+            if not rows:
+                return results
             
             await self.initialize_pool()
             
             async with self.pool.acquire() as conn:
-                # Insert memory with proper vector format
-                memory_id = await conn.fetchval("""
-                    INSERT INTO intelligent_memories 
-                    (user_id, conversation_id, message_id, content, message_type, embedding, importance, created_at)
-                    VALUES ($1, $2, $3, $4, $5, $6::vector, $7, $8)
-                    RETURNING id
-                """, user_id, conversation_id, message_id, content, message_type, str(embedding), importance, datetime.now())
-                
-                print(f"✅ Memory stored: {memory_id}")
-                return str(memory_id)
+                # Imports and backfills stream through COPY; chat-sized batches use one INSERT
+                if len(rows) >= STORE_MEMORY_COPY_THRESHOLD:
+                    await conn.copy_records_to_table(
+                        'intelligent_memories', records=rows, columns=STORE_MEMORY_COLUMNS
+                    )
+                else:
+                    await conn.executemany(STORE_MEMORY_SQL, rows)
+            
+            # Cached retrieval results for these users no longer include everything they know
+            for user_id in {row[1] for row in rows}:
+                self._semantic_cache.invalidate_user(user_id)
+            
+            for row in rows:
+                print(f"✅ Memory stored: {row[0]}")
+            return results
                 
         except Exception as e:
-            print(f"Error storing memory: {e}")
-            return None
+            print(f"Error storing memories: {e}")
+            return [None] * len(memories)
+    
+    async def store_memory(self, content: str, user_id: str, conversation_id: Optional[str], 
+                          message_type: str = "user", message_id: Optional[int] = None) -> Optional[str]:
+        """Store memory with intelligent importance scoring"""
+        results = await self.store_memories([{
+            'content': content,
+            'user_id': user_id,
+            'conversation_id': conversation_id,
+            'message_type': message_type,
+            'message_id': message_id
+        }])
+        return results[0]
     
     async def retrieve_memory(self, query: str, user_id: str, conversation_id: Optional[str], 
                             limit: int = 5) -> str:
@@ -167,58 +624,53 @@ class PostgreSQLMemorySystem:
             return ""
         
         # Generate query embedding
-        query_embedding = self.generate_embedding(query)
+        query_embedding = await self.generate_embedding(query)
         if not query_embedding:
             return ""
         
+        # Convert once; the float32 array is shared by the semantic cache and the binding
+        query_vector = to_vector(query_embedding)
+        
+        # Near-duplicate of a recent query: reuse its context and skip the vector search
+        cache_scope = (user_id, conversation_id, limit)
+        cached_context = self._semantic_cache.get(cache_scope, query_vector)
+        if cached_context is not None:
+            return cached_context
+        
         try:
             await self.initialize_pool()
             
             async with self.pool.acquire() as conn:
-                # Search memories with quality-boosted scoring
-                memories = await conn.fetch("""
-                    SELECT content, 
-                           1 - (embedding <=> $1::vector) as similarity,
-                           final_quality_score,
-                           CASE 
-                               WHEN final_quality_score IS NOT NULL 
-                               THEN final_quality_score * 0.2 + (1 - (embedding <=> $1::vector)) * 0.8
-                               ELSE 1 - (embedding <=> $1::vector)
-                           END as boosted_score
-                    FROM intelligent_memories 
-                    WHERE user_id = $2 
-                    AND (1 - (embedding <=> $1::vector)) > 0.3
-                    ORDER BY boosted_score DESC 
-                    LIMIT $3
-                """, str(query_embedding), user_id, limit)
+                # A bitmap scan for the user_id filter would bypass the vector index and
+                # recheck heap rows; the iterative scan keeps the filtered index scan from
+                # running out of this user's candidates. SET LOCAL keeps the planner
+                # changes to this query only
+                async with conn.transaction():
+                    await conn.execute("SET LOCAL enable_bitmapscan = off")
+                    await conn.execute(f"SET LOCAL hnsw.ef_search = {HNSW_EF_SEARCH}")
+                    await conn.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+                    await conn.execute(f"SET LOCAL hnsw.max_scan_tuples = {HNSW_MAX_SCAN_TUPLES}")
+                    memories = await conn.fetch(
+                        SEARCH_MEMORIES_SQL, query_vector, user_id, limit,
+                        SEARCH_CANDIDATE_LIMIT, conversation_id,
+                        RECENT_CONTEXT_WINDOW, RECENT_CONTEXT_LIMIT
+                    )
                 
+                # Semantic matches, or recent conversation context if there were none
                 memory_texts = []
                 for record in memories:
+                    msg_type = record['message_type']
                     content = record['content']
-                    similarity = record['similarity']
-                    memory_texts.append(f"Previous message: {content}")
-                
-                # Also get recent conversation context if no semantic matches
-                if not memory_texts and conversation_id:
-                    recent_memories = await conn.fetch("""
-                        SELECT content, message_type
-                        FROM intelligent_memories
-                        WHERE user_id = $1 
-                        AND conversation_id = $2
-                        AND created_at > $3
-                        ORDER BY created_at DESC
-                        LIMIT 5
-                    """, user_id, conversation_id, datetime.now() - timedelta(hours=1))
-                    
-                    for record in recent_memories:
-                        msg_type = record['message_type']
-                        content = record['content']
-                        if msg_type == 'user':
-                            memory_texts.append(f"User previously said: {content}")
-                        else:
-                            memory_texts.append(f"You previously responded: {content}")
+                    if msg_type is None:
+                        memory_texts.append(f"Previous message: {content}")
+                    elif msg_type == 'user':
+                        memory_texts.append(f"User previously said: {content}")
+                    else:
+                        memory_texts.append(f"You previously responded: {content}")
                 
-                return "\n".join(memory_texts) if memory_texts else ""
+                memory_context = "\n".join(memory_texts) if memory_texts else ""
+                self._semantic_cache.put(cache_scope, query_vector, memory_context)
+                return memory_context
                 
         except Exception as e:
             print(f"Error retrieving memories: {e}")
@@ -226,25 +678,35 @@ class PostgreSQLMemorySystem:
     
     async def update_memory_quality_score(self, memory_id: str, quality_score: float) -> bool:
         """Update quality score for a specific memory (RIAI scoring)"""
+        return await self.update_memory_quality_scores_bulk([(memory_id, quality_score)]) == 1
+    
+    async def update_memory_quality_scores_bulk(self, scores: List[Tuple[str, float]]) -> int:
+        """Update R(t) scores for many memories in one statement; returns rows updated"""
+        if not scores:
+            return 0
         try:
             await self.initialize_pool()
             
             async with self.pool.acquire() as conn:
                 result = await conn.execute("""
-                    UPDATE intelligent_memories 
-                    SET r_t_score = $1, updated_at = $2
-                    WHERE id = $3
-                """, quality_score, datetime.now(), int(memory_id))
+                    UPDATE intelligent_memories m
+                    SET r_t_score = t.score, updated_at = NOW()
+                    FROM unnest($1::uuid[], $2::float8[]) AS t(id, score)
+                    WHERE m.id = t.id
+                """, [memory_id for memory_id, _ in scores], [score for _, score in scores])
                 
-                return result == "UPDATE 1"
+                return int(result.split()[-1])
                 
         except Exception as e:
-            print(f"Error updating memory quality score: {e}")
-            return False
+            print(f"Error updating memory quality scores: {e}")
+            return 0
     
     async def update_human_feedback_by_node_id(self, node_id: str, feedback_score: float, 
                                              feedback_type: str, user_id: str) -> bool:
-        """Update memory with human feedback using memory ID"""
+        """Update memory with human feedback using memory ID
+        
+        The final quality score f(R(t), H(t)) is recomputed in the same statement.
+        """
         try:
             await self.initialize_pool()
             
@@ -252,9 +714,10 @@ class PostgreSQLMemorySystem:
                 result = await conn.execute("""
                     UPDATE intelligent_memories 
                     SET h_t_score = $1, 
-                        updated_at = $2
-                    WHERE id = $3 AND user_id = $4
-                """, feedback_score, datetime.now(), int(node_id), user_id)
+                        final_quality_score = GREATEST(0.0, LEAST(1.0, COALESCE(r_t_score, 0.5) + 1.5 * $1)),
+                        updated_at = NOW()
+                    WHERE id = $2::uuid AND user_id = $3
+                """, feedback_score, node_id, user_id)
                 
                 return result == "UPDATE 1"
                 
@@ -279,40 +742,35 @@ class PostgreSQLMemorySystem:
     
     async def update_final_quality_score(self, memory_id: str, user_id: str) -> bool:
         """Update final quality score for a memory using f(R(t), H(t))"""
+        return await self.update_final_quality_scores_bulk([memory_id], user_id) == 1
+    
+    async def update_final_quality_scores_bulk(self, memory_ids: List[str], user_id: str) -> int:
+        """Recompute final quality scores for many memories in SQL; returns rows updated
+        
+        Applies calculate_final_quality_score server-side, so there is no read of the
+        current scores and no per-row round-trip.
+        """
+        if not memory_ids:
+            return 0
         try:
             await self.initialize_pool()
             
             async with self.pool.acquire() as conn:
-                # Get current R(t) and H(t) scores
-                record = await conn.fetchrow("""
-                    SELECT r_t_score, h_t_score
-                    FROM intelligent_memories
-                    WHERE id = $1 AND user_id = $2
-                """, int(memory_id), user_id)
-                
-                if not record:
-                    return False
-                
-                r_t_score = record['r_t_score']
-                h_t_score = record['h_t_score']
-                
-                # Calculate final quality score
-                final_score = self.calculate_final_quality_score(r_t_score, h_t_score)
-                
-                if final_score is not None:
-                    result = await conn.execute("""
-                        UPDATE intelligent_memories
-                        SET final_quality_score = $1, updated_at = $2
-                        WHERE id = $3 AND user_id = $4
-                    """, final_score, datetime.now(), int(memory_id), user_id)
-                    
-                    return result == "UPDATE 1"
+                # f(R(t), H(t)) = R(t) + 1.5 * H(t), defaults 0.5 and 0.0, clamped to [0, 1]
+                result = await conn.execute("""
+                    UPDATE intelligent_memories
+                    SET final_quality_score = GREATEST(0.0, LEAST(1.0,
+                            COALESCE(r_t_score, 0.5) + 1.5 * COALESCE(h_t_score, 0.0))),
+                        updated_at = NOW()
+                    WHERE id = ANY($1::uuid[]) AND user_id = $2
+                    AND (r_t_score IS NOT NULL OR h_t_score IS NOT NULL)
+                """, memory_ids, user_id)
                 
-                return False
+                return int(result.split()[-1])
                 
         except Exception as e:
-            print(f"Error updating final quality score: {e}")
-            return False
+            print(f"Error updating final quality scores: {e}")
+            return 0
     
     async def get_unscored_memories(self, user_id: str, limit: int = 10) -> List[Dict]:
         """Get memories that haven't been quality scored yet"""
@@ -320,63 +778,175 @@ class PostgreSQLMemorySystem:
             await self.initialize_pool()
             
             async with self.pool.acquire() as conn:
+                # The user message that prompted each response is the latest user memory
+                # stored before it in the same conversation
                 records = await conn.fetch("""
-                    SELECT id, content
-                    FROM intelligent_memories
-                    WHERE user_id = $1 
-                    AND r_t_score IS NULL
-                    AND message_type = 'assistant'
-                    ORDER BY created_at DESC
+                    SELECT m.id, m.content, q.content AS user_query
+                    FROM intelligent_memories m
+                    LEFT JOIN LATERAL (
+                        SELECT content
+                        FROM intelligent_memories
+                        WHERE user_id = m.user_id
+                        AND conversation_id = m.conversation_id
+                        AND message_type = 'user'
+                        AND created_at <= m.created_at
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    ) q ON TRUE
+                    WHERE m.user_id = $1 
+                    AND m.r_t_score IS NULL
+                    AND m.message_type = 'assistant'
+                    ORDER BY m.created_at DESC
                     LIMIT $2
                 """, user_id, limit)
                 
-                return [{'memory_id': str(record['id']), 'content': record['content']} for record in records]
+                return [{'memory_id': str(record['id']), 'content': record['content'],
+                         'user_query': record['user_query'] or ""} for record in records]
                 
         except Exception as e:
             print(f"Error getting unscored memories: {e}")
             return []
     
+    @staticmethod
+    def _evaluation_cache_key(user_query: str, ai_response: str) -> str:
+        """Cache key for an evaluated query/response pair"""
+        return hashlib.sha1(f"{user_query}\0{ai_response}".encode()).hexdigest()
+    
+    def _cache_evaluation(self, cache_key: str, score: float):
+        """Add a score to the evaluation LRU, evicting the oldest entry when full"""
+        if EVALUATION_CACHE_SIZE <= 0:
+            return
+        self._evaluation_cache[cache_key] = score
+        self._evaluation_cache.move_to_end(cache_key)
+        while len(self._evaluation_cache) > EVALUATION_CACHE_SIZE:
+            self._evaluation_cache.popitem(last=False)
+    
+    async def _request_evaluation(self, prompt: str, max_tokens: int = EVALUATION_MAX_TOKENS) -> Optional[str]:
+        """Send one prompt to the evaluator model and return its reply text"""
+        # Use OpenRouter API for evaluation over the shared pooled client, so each
+        # call reuses a warm connection instead of a new TLS handshake
+        response = await get_model_service().http_client.post(
+            "https://openrouter.ai/api/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": EVALUATION_MODEL,
+                "messages": [
+                    {"role": "system", "content": EVALUATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                "max_tokens": max_tokens
+            },
+            timeout=30.0
+        )
+        
+        if response.status_code != 200:
+            print(f"Evaluation request failed: {response.status_code}")
+            return None
+        return response.json()['choices'][0]['message']['content']
+    
     async def evaluate_response(self, user_query: str, ai_response: str) -> Optional[float]:
         """Evaluate AI response quality using external model (R(t) function)"""
+        cache_key = self._evaluation_cache_key(user_query, ai_response)
+        cached_score = self._evaluation_cache.get(cache_key)
+        if cached_score is not None:
+            self._evaluation_cache.move_to_end(cache_key)
+            return cached_score
+        
         try:
-            # Use OpenRouter API for evaluation (same as current system)
-            import httpx
+            score_text = await self._request_evaluation(
+                f"User Question: {user_query}\n\nAI Response: {ai_response}\n\n"
+                "Respond with only the numeric score.\n\nQuality Score (0.0-1.0):"
+            )
+            if score_text is None:
+                return None
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "mistralai/mistral-small-3.2-24b-instruct",
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are an AI response evaluator. Rate the quality of AI responses on a scale of 0.0 to 1.0 based on accuracy, helpfulness, and relevance. Respond with only the numeric score."
-                            },
-                            {
-                                "role": "user",
-                                "content": f"User Question: {user_query}\n\nAI Response: {ai_response}\n\nQuality Score (0.0-1.0):"
-                            }
-                        ]
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    score_text = data['choices'][0]['message']['content'].strip()
-                    try:
-                        score = float(score_text)
-                        return max(0.0, min(1.0, score))
-                    except ValueError:
-                        return 0.5
+            match = EVALUATION_SCORE_RE.search(score_text)
+            if not match:
+                return 0.5
+            
+            score = max(0.0, min(1.0, float(match.group())))
+            self._cache_evaluation(cache_key, score)
+            return score
                 
         except Exception as e:
             print(f"Error evaluating response: {e}")
             return 0.5
     
+    async def evaluate_responses_batch(self, pairs: List[Tuple[str, str]]) -> List[Optional[float]]:
+        """Evaluate several (user_query, ai_response) pairs with a single evaluator request
+        
+        Falls back to one evaluate_response call per pair if the reply can't be parsed.
+        """
+        scores: List[Optional[float]] = [None] * len(pairs)
+        pending = []
+        for index, (user_query, ai_response) in enumerate(pairs):
+            cache_key = self._evaluation_cache_key(user_query, ai_response)
+            cached_score = self._evaluation_cache.get(cache_key)
+            if cached_score is not None:
+                self._evaluation_cache.move_to_end(cache_key)
+                scores[index] = cached_score
+            else:
+                pending.append((index, cache_key))
+        if not pending:
+            return scores
+        
+        numbered = "\n\n".join(
+            f"{number}. User Question: {pairs[index][0]}\nAI Response: {pairs[index][1]}"
+            for number, (index, _) in enumerate(pending, 1)
+        )
+        prompt = (f"Rate each of the following {len(pending)} AI responses. Respond with only a "
+                  f"JSON array of {len(pending)} numeric scores (0.0-1.0), in order.\n\n{numbered}")
+        
+        try:
+            reply = await self._request_evaluation(
+                prompt, EVALUATION_MAX_TOKENS + EVALUATION_BATCH_TOKENS_PER_SCORE * len(pending)
+            )
+            array_match = EVALUATION_ARRAY_RE.search(reply or "")
+            batch_scores = json.loads(array_match.group()) if array_match else None
+            if not isinstance(batch_scores, list) or len(batch_scores) != len(pending):
+                raise ValueError(f"expected {len(pending)} scores, got: {reply!r}")
+            
+            for (index, cache_key), score in zip(pending, batch_scores):
+                score = max(0.0, min(1.0, float(score)))
+                self._cache_evaluation(cache_key, score)
+                scores[index] = score
+            return scores
+            
+        except Exception as e:
+            print(f"Error evaluating response batch, evaluating individually: {e}")
+        
+        semaphore = asyncio.Semaphore(EVALUATION_CONCURRENCY)
+        
+        async def evaluate_with_limit(index: int) -> Optional[float]:
+            async with semaphore:
+                return await self.evaluate_response(*pairs[index])
+        
+        individual_scores = await asyncio.gather(*[evaluate_with_limit(index) for index, _ in pending])
+        for (index, _), score in zip(pending, individual_scores):
+            scores[index] = score
+        return scores
+    
+    async def score_unscored_memories_background(self, user_id: str) -> Dict[str, int]:
+        """Score a user's unscored assistant memories with one batched evaluation"""
+        memories = await self.get_unscored_memories(user_id, EVALUATION_BATCH_SIZE)
+        if not memories:
+            return {'evaluated': 0, 'updated': 0}
+        
+        scores = await self.evaluate_responses_batch(
+            [(memory['user_query'], memory['content']) for memory in memories]
+        )
+        scored = [(memory['memory_id'], score)
+                  for memory, score in zip(memories, scores) if score is not None]
+        
+        updated = await self.update_memory_quality_scores_bulk(scored)
+        if updated:
+            await self.update_final_quality_scores_bulk([memory_id for memory_id, _ in scored], user_id)
+            print(f"✅ Scored {updated} memories for user {user_id}")
+        return {'evaluated': len(scored), 'updated': updated}
+    
     def close(self):
         """Close database connections"""
         if self.pool:
@@ -11,6 +11,9 @@ import requests
 import os
 from datetime import datetime
 
+# Module-level session so every generation request reuses pooled keep-alive connections
+_http_session = requests.Session()
+
 class ToolGenerator:
     """Generate custom tools using Mistral-Small-3.2 for function calling optimization"""
     
@@ -125,7 +128,7 @@ Example for "calculate circle area":
 Generate tool for: {user_request}"""
 
         try:
-            response = requests.post(
+            response = _http_session.post(
                 f"{self.base_url}/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.api_key}",